@@ -0,0 +1,214 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from backend.database import engine
+from backend.models import ActivityHourlyCount, ActivityType, UserActivity
+
+# Configuration
+ACTIVITY_QUEUE_MAX_SIZE = int(os.getenv("ACTIVITY_QUEUE_MAX_SIZE", "10000"))
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "500"))
+ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "1"))
+# How long a request may wait for room in a full queue before its event is dropped
+ACTIVITY_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("ACTIVITY_ENQUEUE_TIMEOUT_SECONDS", "0.05"))
+
+
+ROLLUP_HOUR_FORMAT = "%Y-%m-%d %H:00"
+ROLLUP_KEY_COLUMNS = ["hour", "activity_type", "profile_id", "country_code"]
+
+
+def record_activity_counts(session: Session, events: List[Dict[str, Any]]) -> None:
+    """
+    Adds a batch of activity events to the hourly counters, one upsert per distinct key.
+    """
+    counts = Counter(
+        (
+            event["timestamp"].strftime(ROLLUP_HOUR_FORMAT),
+            ActivityType(event["activity_type"]),
+            event.get("profile_id") or 0,
+            event.get("country_code") or "",
+        )
+        for event in events
+    )
+    statement = sqlite_insert(ActivityHourlyCount)
+    statement = statement.on_conflict_do_update(
+        index_elements=ROLLUP_KEY_COLUMNS,
+        set_={"event_count": ActivityHourlyCount.event_count + statement.excluded.event_count},
+    )
+    session.execute(statement, [
+        {"hour": hour, "activity_type": activity_type, "profile_id": profile_id, "country_code": country_code, "event_count": count}
+        for (hour, activity_type, profile_id, country_code), count in counts.items()
+    ])
+
+
+def backfill_activity_counts(session: Session) -> int:
+    """
+    Builds the hourly counters from the raw activity table. Returns the number of counter rows created.
+    Keys that already have a counter are skipped, so processes starting together can all run it.
+    """
+    hour = func.strftime(ROLLUP_HOUR_FORMAT, UserActivity.timestamp)
+    profile_id = func.coalesce(UserActivity.profile_id, 0)
+    country_code = func.coalesce(UserActivity.country_code, "")
+    result = session.execute(
+        sqlite_insert(ActivityHourlyCount)
+        .from_select(
+            ROLLUP_KEY_COLUMNS + ["event_count"],
+            select(hour, UserActivity.activity_type, profile_id, country_code, func.count())
+            .group_by(hour, UserActivity.activity_type, profile_id, country_code),
+        )
+        .on_conflict_do_nothing(index_elements=ROLLUP_KEY_COLUMNS)
+    )
+    return result.rowcount
+
+
+class ActivityWriter:
+    """
+    Buffers activity events in a bounded in-process queue and writes them from a background
+    thread, one multi-row INSERT and one commit per batch. The hourly counters are updated in
+    the same transaction. A batch is written when it reaches
+    `batch_size` events or `flush_interval` seconds after its first event.
+
+    When the queue is full, a request waits up to `enqueue_timeout` seconds for room and then
+    drops the event, so a slow database never stalls the API. Dropped events are counted.
+    Until the writer is started (scripts, tests without the app lifespan), events are written
+    synchronously.
+    """
+
+    def __init__(
+        self,
+        max_size: int = ACTIVITY_QUEUE_MAX_SIZE,
+        batch_size: int = ACTIVITY_BATCH_SIZE,
+        flush_interval: float = ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        enqueue_timeout: float = ACTIVITY_ENQUEUE_TIMEOUT_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._work, name="activity-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Stops the background thread after writing every queued event.
+        """
+        if not self._thread:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._write_queued()
+
+    def enqueue(self, event: Dict[str, Any]) -> None:
+        if not self._thread:
+            self._write([event])
+            return
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+                dropped = self._dropped
+            if dropped % 1000 == 1:
+                logging.warning(f"Activity queue is full; dropped {dropped} events so far.")
+
+    def flush(self, timeout: float = 10) -> bool:
+        """
+        Waits until every event queued before the call has been written, for at most `timeout`
+        seconds in total. Returns False if the wait timed out.
+        """
+        if not self._thread:
+            self._write_queued()
+            return True
+        # The marker travels behind the queued events; the writer sets it after writing them
+        deadline = time.monotonic() + timeout
+        written = threading.Event()
+        try:
+            self._queue.put(written, timeout=timeout)
+        except queue.Full:
+            return False
+        return written.wait(max(deadline - time.monotonic(), 0))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self._written,
+            "dropped": self._dropped,
+            "failed": self._failed,
+        }
+
+    def _write_queued(self) -> None:
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        with self._write_lock:
+            try:
+                with Session(engine) as session:
+                    session.execute(insert(UserActivity), batch)
+                    record_activity_counts(session, batch)
+                    session.commit()
+                self._written += len(batch)
+            except Exception as e:
+                self._failed += len(batch)
+                logging.error(f"Could not write {len(batch)} activity events: {e}")
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, flush_markers = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    flush_markers.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0 or self._stopping.is_set():
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for marker in flush_markers:
+                marker.set()
+
+activity_writer = ActivityWriter()
@@ -0,0 +1,210 @@
+import csv
+import gzip
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from backend.database import engine
+from backend.export import pa, pq, parquet_available
+from backend.models import UserActivity
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Configuration
+# Raw activity events older than this are moved to archive files; 0 (the default) keeps them in the database
+ACTIVITY_RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "0"))
+ACTIVITY_ARCHIVE_DIR = Path(os.getenv("ACTIVITY_ARCHIVE_DIR", str(PROJECT_ROOT / "local_cache" / "activity_archive")))
+ACTIVITY_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_ARCHIVE_INTERVAL_SECONDS", "21600"))
+ACTIVITY_ARCHIVE_BATCH_SIZE = int(os.getenv("ACTIVITY_ARCHIVE_BATCH_SIZE", "5000"))
+
+ARCHIVE_COLUMNS = ["id", "user_id", "profile_id", "activity_type", "timestamp", "ip_address", "country_code"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+if pa is not None:
+    ARCHIVE_SCHEMA = pa.schema([
+        ("id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("profile_id", pa.int64()),
+        ("activity_type", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("ip_address", pa.string()),
+        ("country_code", pa.string()),
+    ])
+
+
+def _write_part(month_dir: Path, rows: List[Dict[str, Any]]) -> Path:
+    """
+    Writes one month's share of a batch to its own part file, named after its first event id.
+    A batch that is archived again after a crash (before its rows were deleted) starts at the
+    same id and overwrites the earlier file instead of duplicating it.
+    """
+    month_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"part-{rows[0]['id']:012d}"
+    tmp_suffix = f".{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+    path = month_dir / (f"{stem}.parquet" if parquet_available() else f"{stem}.csv.gz")
+    tmp_path = path.with_name(path.name + tmp_suffix)
+    try:
+        if parquet_available():
+            table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+            pq.write_table(table, tmp_path, compression="zstd")
+        else:
+            with gzip.open(tmp_path, "wt", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(ARCHIVE_COLUMNS)
+                for row in rows:
+                    writer.writerow([
+                        row["timestamp"].strftime(TIMESTAMP_FORMAT) if column == "timestamp" else row[column]
+                        for column in ARCHIVE_COLUMNS
+                    ])
+        os.replace(tmp_path, path)  # Readers never see a partially written file
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return path
+
+
+def archive_activity(retention_days: int = ACTIVITY_RETENTION_DAYS, batch_size: int = ACTIVITY_ARCHIVE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Moves raw activity events older than the retention period to per-month archive files
+    (ACTIVITY_ARCHIVE_DIR/YYYY-MM/part-*.parquet, or .csv.gz without pyarrow) and deletes them
+    from useractivity. The hourly counters are kept. Each batch is written to disk before its
+    rows are deleted, so an interrupted run loses nothing. Each batch runs in a BEGIN IMMEDIATE
+    transaction, so processes archiving at the same time take turns and never archive the same rows.
+    """
+    if retention_days <= 0:
+        return {"archived": 0, "files": 0}
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    archived = files = 0
+    with Session(engine) as session:
+        while True:
+            # Take the write lock before reading the batch; it is released by the commit below
+            session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            rows = session.exec(
+                select(*[getattr(UserActivity, column) for column in ARCHIVE_COLUMNS])
+                .where(UserActivity.timestamp < cutoff)
+                .order_by(UserActivity.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                session.rollback()
+                break
+            by_month: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                event = dict(zip(ARCHIVE_COLUMNS, row))
+                event["activity_type"] = getattr(event["activity_type"], "value", event["activity_type"])
+                by_month.setdefault(event["timestamp"].strftime("%Y-%m"), []).append(event)
+            for month, events in by_month.items():
+                _write_part(ACTIVITY_ARCHIVE_DIR / month, events)
+                files += 1
+            # The batch is every event before the cutoff up to its last id
+            session.execute(
+                delete(UserActivity).where(UserActivity.timestamp < cutoff, UserActivity.id <= rows[-1][0])
+            )
+            session.commit()
+            archived += len(rows)
+    if archived:
+        logging.info(f"Archived {archived} activity events older than {cutoff:%Y-%m-%d} into {files} file(s).")
+    return {"archived": archived, "files": files}
+
+
+def _read_part(path: Path) -> List[Dict[str, Any]]:
+    if path.name.endswith(".parquet"):
+        return pq.read_table(path).to_pylist()
+    with gzip.open(path, "rt", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for column in ("id", "user_id", "profile_id"):
+            row[column] = int(row[column]) if row[column] else None
+        row["timestamp"] = datetime.strptime(row["timestamp"], TIMESTAMP_FORMAT)
+        row["ip_address"] = row["ip_address"] or None
+        row["country_code"] = row["country_code"] or None
+    return rows
+
+
+def iter_archived_activity(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    profile_id: Optional[int] = None,
+    activity_type: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields archived events matching the filters in timestamp order, reading only the months in range.
+    """
+    if not ACTIVITY_ARCHIVE_DIR.exists():
+        return
+    first_month = start_date.strftime("%Y-%m") if start_date else None
+    last_month = end_date.strftime("%Y-%m") if end_date else None
+    for month_dir in sorted(ACTIVITY_ARCHIVE_DIR.iterdir()):
+        if not month_dir.is_dir() or (first_month and month_dir.name < first_month) or (last_month and month_dir.name > last_month):
+            continue
+        events = []
+        for path in month_dir.iterdir():
+            if path.name.endswith((".parquet", ".csv.gz")):
+                events.extend(_read_part(path))
+        events.sort(key=lambda event: (event["timestamp"], event["id"]))
+        for event in events:
+            if start_date and event["timestamp"] < start_date:
+                continue
+            if end_date and event["timestamp"] > end_date:
+                continue
+            if user_id and event["user_id"] != user_id:
+                continue
+            if profile_id and event["profile_id"] != profile_id:
+                continue
+            if activity_type and event["activity_type"] != activity_type:
+                continue
+            yield event
+
+
+class ActivityArchiver:
+    """
+    Runs archive_activity on a background thread every `interval` seconds.
+    """
+
+    def __init__(self, interval: float = ACTIVITY_ARCHIVE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._thread = None
+        self._stopping = threading.Event()
+        self._run_lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._thread or ACTIVITY_RETENTION_DAYS <= 0:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._work, name="activity-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        if not self._thread:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Archives now; concurrent calls wait for the run in progress instead of overlapping it.
+        """
+        with self._run_lock:
+            result = archive_activity()
+            self.last_run = {"finished_at": datetime.utcnow(), **result}
+            return self.last_run
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                logging.error(f"Activity archiving failed: {e}")
+            self._stopping.wait(self.interval)
+
+
+activity_archiver = ActivityArchiver()
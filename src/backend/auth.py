@@ -1,30 +1,128 @@
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlmodel import Session, select
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session, delete, select, update
 
+from backend.cache import TTLCache
 from backend.database import get_session
-from backend.models import User, Role
+from backend.models import User, Role, RefreshToken
 
 # Configuration
 SECRET_KEY = "your-secret-key"  # TODO: Move to environment variables
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "10"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other work factor are flagged for a rehash at the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/login")
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool, so a burst of logins queues here instead of
+    occupying the request worker threads. At most `max_pending` operations may be queued or
+    running; beyond that callers get a 503 rather than an ever-growing queue. Keep `max_pending`
+    below the database connection pool (15) and the request threadpool (40), so an overload is
+    rejected here before either runs out.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                logging.warning(f"Password hashing queue is full ({self._pending} pending); rejecting request.")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent sign-ins; please retry shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, fn, *args):
+        """
+        Awaits `fn(*args)` on the pool; the waiting request holds no worker thread.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "pending": self._pending,
+                "peak_pending": self._peak_pending,
+                "max_pending": self.max_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+password_hasher = PasswordHasher()
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.submit(pwd_context.verify, plain_password, hashed_password).result()
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.submit(pwd_context.hash, password).result()
+
+
+async def verify_and_update_password_async(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the hashing pool without holding a request thread. Returns
+    (valid, new_hash); new_hash is set when the stored hash uses an outdated work factor
+    and should be replaced.
+    """
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -38,10 +136,133 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def create_user_access_token(user: User) -> str:
+    """
+    Issues an access token carrying the user's email (sub), id (uid) and role.
+    """
+    return create_access_token(
+        data={"sub": user.email, "uid": user.id, "role": user.role.value},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+def _hash_refresh_token(token: str) -> str:
+    # Refresh tokens are 256 random bits, so a fast unsalted hash is enough to keep them unusable if the table leaks
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def purge_expired_refresh_tokens(session: Session, user_id: int) -> None:
+    """
+    Deletes the user's expired refresh tokens. Revoked tokens are kept until they expire, so
+    reuse of a rotated token is still detected.
+    """
+    session.execute(
+        delete(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.expires_at < datetime.utcnow())
+    )
+
+
+def issue_refresh_token(session: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """
+    Creates a refresh token for the user, starting a new family unless `family_id` is given,
+    and purges the user's expired tokens. Only its hash is stored; the caller commits the
+    session and returns the token to the client.
+    """
+    purge_expired_refresh_tokens(session, user_id)
+    token = secrets.token_urlsafe(32)
+    session.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+def revoke_refresh_token_family(session: Session, family_id: str) -> None:
+    session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def revoke_user_refresh_tokens(session: Session, user_id: int) -> None:
+    session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def rotate_refresh_token(session: Session, token: str) -> Tuple[User, str]:
+    """
+    Exchanges a refresh token for a new one and returns (user, new_token); commits the session.
+    Presenting an already used or revoked token is treated as theft: the whole family is revoked.
+    """
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    db_token = session.exec(
+        select(RefreshToken).where(RefreshToken.token_hash == _hash_refresh_token(token))
+    ).first()
+    if db_token is None or db_token.expires_at < datetime.utcnow():
+        raise invalid_token_exception
+    # Conditional update, so two concurrent refreshes with the same token cannot both succeed
+    now = datetime.utcnow()
+    claimed = session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == db_token.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    ).rowcount
+    if not claimed:
+        revoke_refresh_token_family(session, db_token.family_id)
+        session.commit()
+        logging.warning(f"Reuse of a revoked refresh token for user ID {db_token.user_id}; revoked its token family.")
+        raise invalid_token_exception
+    user = session.get(User, db_token.user_id)
+    if user is None:
+        session.rollback()
+        raise invalid_token_exception
+    new_token = issue_refresh_token(session, user.id, db_token.family_id)
+    session.commit()
+    return user, new_token
+
+
+def revoke_refresh_token(session: Session, token: str) -> Optional[int]:
+    """
+    Revokes the family of the given refresh token (logout). Returns the token's user id, or None if unknown.
+    """
+    db_token = session.exec(
+        select(RefreshToken).where(RefreshToken.token_hash == _hash_refresh_token(token))
+    ).first()
+    if db_token is None:
+        return None
+    revoke_refresh_token_family(session, db_token.family_id)
+    session.commit()
+    return db_token.user_id
+
+
 def get_user(session: Session, email: str) -> Optional[User]:
     return session.exec(select(User).where(User.email == email)).first()
 
 
+# Detached copies of recently authenticated users, keyed by user id.
+# Call invalidate_cached_user after changing a user's role, password, details or subscription.
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+
+
+def _detached_copy(user: User) -> User:
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    user_cache.delete(user_id)
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,9 +276,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = get_user(session, email=email)
+    user_id = payload.get("uid")
+    if user_id is None:  # Token issued before tokens carried the user id
+        user = get_user(session, email=email)
+    else:
+        cached_user = user_cache.get(user_id)
+        if cached_user is not None:
+            # Attach a copy to this session without a SELECT; the cached object itself is never modified
+            return session.merge(cached_user, load=False)
+        user = session.get(User, user_id)
     if user is None:
         raise credentials_exception
+    user_cache.set(user.id, _detached_copy(user))
     return user
 
 
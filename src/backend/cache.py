@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Configuration
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory, sqlite or none
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_PATH = Path(os.getenv("RESPONSE_CACHE_PATH", str(PROJECT_ROOT / "local_cache" / "response_cache.db")))
+
+
+def make_cache_key(profile_id: int, data_version: int, *parts: Any) -> str:
+    """
+    Builds a cache key scoped to a profile and its data version.
+    Bumping the version makes every older entry unreachable.
+    """
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return f"{profile_id}:{data_version}:{digest}"
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a per-entry time to live and LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, profile_id, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key: str, value: Any, profile_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, profile_id, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_profile(self, profile_id: int) -> None:
+        with self._lock:
+            stale_keys = [key for key, entry in self._entries.items() if entry[1] == profile_id]
+            for key in stale_keys:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    TTL + LRU cache stored in a local SQLite file, so several workers on the same host share entries.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")  # Stored in the file, so it applies to every later connection
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, profile_id INTEGER, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_profile_id ON response_cache (profile_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        The calling thread's connection, opened on its first use and reused afterwards.
+        Connections are in autocommit mode, so each statement commits on its own.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, profile_id: Optional[int] = None) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, profile_id, value, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, profile_id, json.dumps(value, default=str), now + self.ttl_seconds, now),
+        )
+        conn.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            "SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def invalidate_profile(self, profile_id: int) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM response_cache WHERE profile_id = ?", (profile_id,))
+
+    def clear(self) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM response_cache")
+
+
+class NullCache:
+    """
+    Cache that stores nothing; used when RESPONSE_CACHE_BACKEND is "none".
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, profile_id: Optional[int] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def invalidate_profile(self, profile_id: int) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+def create_response_cache():
+    if RESPONSE_CACHE_BACKEND == "sqlite":
+        logging.info(f"Using shared SQLite response cache at {RESPONSE_CACHE_PATH}")
+        return SQLiteCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+    if RESPONSE_CACHE_BACKEND == "none":
+        return NullCache()
+    return TTLCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = create_response_cache()
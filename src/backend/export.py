@@ -0,0 +1,92 @@
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only Parquet export needs it
+    pa = None
+    pc = None
+    pq = None
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def iter_csv(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[str]:
+    """
+    Yields a CSV document one chunk per batch of rows, starting with the header.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back to the caller on drain(),
+    so a ParquetWriter can be streamed without holding the whole file.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(
+    schema,
+    batches: Iterable[Sequence[Sequence[Any]]],
+    date_columns: Optional[Dict[str, str]] = None,
+) -> Iterator[bytes]:
+    """
+    Yields a Parquet file incrementally, writing one row group per batch of rows.
+    `date_columns` maps column names holding date strings to their strptime format;
+    they are converted to the schema's date type (unparseable dates become null).
+    """
+    date_columns = date_columns or {}
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            columns = list(zip(*rows)) if rows else [[] for _ in schema.names]
+            arrays = []
+            for name, values in zip(schema.names, columns):
+                field_type = schema.field(name).type
+                if name in date_columns:
+                    timestamps = pc.strptime(
+                        pa.array(values, type=pa.string()), format=date_columns[name], unit="s", error_is_null=True
+                    )
+                    arrays.append(timestamps.cast(field_type))
+                else:
+                    arrays.append(pa.array(values, type=field_type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
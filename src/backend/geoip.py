@@ -0,0 +1,66 @@
+import ipaddress
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+try:
+    import maxminddb
+except ImportError:  # Listed in requirements.txt; without it no address can be resolved
+    maxminddb = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Configuration
+GEOIP_DATABASE_PATH = Path(os.getenv("GEOIP_DATABASE_PATH", str(PROJECT_ROOT / "data" / "geoip" / "GeoLite2-Country.mmdb")))
+GEOIP_CACHE_SIZE = int(os.getenv("GEOIP_CACHE_SIZE", "10000"))
+# Country for addresses that cannot be resolved (local, private, unknown, or no database).
+# Unset by default, so those addresses get no country rather than a wrong one.
+GEOIP_DEFAULT_COUNTRY = os.getenv("GEOIP_DEFAULT_COUNTRY") or None
+
+_reader = None
+_reader_loaded = False
+_reader_lock = threading.Lock()
+
+
+def get_reader():
+    """
+    Opens the GeoIP database memory-mapped on first use. Returns None when maxminddb is not
+    installed or the database file does not exist.
+    """
+    global _reader, _reader_loaded
+    if _reader_loaded:
+        return _reader
+    with _reader_lock:
+        if not _reader_loaded:
+            if maxminddb is None:
+                logging.warning("maxminddb is not installed; IP addresses will not be resolved to countries.")
+            elif not GEOIP_DATABASE_PATH.exists():
+                logging.warning(f"GeoIP database {GEOIP_DATABASE_PATH} not found; IP addresses will not be resolved to countries.")
+            else:
+                _reader = maxminddb.open_database(str(GEOIP_DATABASE_PATH), maxminddb.MODE_MMAP)
+                logging.info(f"Opened GeoIP database {GEOIP_DATABASE_PATH}.")
+            _reader_loaded = True
+    return _reader
+
+
+@lru_cache(maxsize=GEOIP_CACHE_SIZE)
+def country_code_for_ip(ip_address: Optional[str]) -> Optional[str]:
+    """
+    ISO country code of an IP address, looked up in the local GeoIP database and cached per address.
+    Returns GEOIP_DEFAULT_COUNTRY (None unless configured) when the address cannot be resolved.
+    """
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:  # None, "localhost", or a malformed client address
+        return GEOIP_DEFAULT_COUNTRY
+    if not address.is_global:
+        return GEOIP_DEFAULT_COUNTRY
+    reader = get_reader()
+    if reader is None:
+        return GEOIP_DEFAULT_COUNTRY
+    record = reader.get(str(address)) or {}
+    country = record.get("country") or record.get("registered_country") or {}
+    return country.get("iso_code") or GEOIP_DEFAULT_COUNTRY
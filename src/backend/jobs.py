@@ -0,0 +1,204 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlmodel import Session, select, update
+from sqlalchemy import DateTime, bindparam, or_, text
+
+from backend.database import engine
+from backend.models import Job, JobStatus, JobType
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Configuration
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job whose heartbeat is older than the lease belongs to a dead process and is requeued
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("JOB_HEARTBEAT_INTERVAL_SECONDS", "15"))
+# A failed job is retried after JOB_RETRY_BACKOFF_SECONDS, doubling with each further attempt
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))
+JOB_FILES_DIR = Path(os.getenv("JOB_FILES_DIR", str(PROJECT_ROOT / "local_cache" / "jobs")))
+
+# A handler processes one job and is expected to commit each chunk together with
+# record_job_progress, so that a restarted job picks up after the last committed chunk.
+JobHandler = Callable[[Session, Job], None]
+
+
+def record_job_progress(session: Session, job: Job, checkpoint: int, processed_rows: int) -> None:
+    """
+    Stages the job's checkpoint in the current transaction; commit it together with the chunk it covers.
+    Also renews the job's lease.
+    """
+    job.checkpoint = checkpoint
+    job.processed_rows = processed_rows
+    job.heartbeat_at = datetime.utcnow()
+    session.add(job)
+
+
+class JobRunner:
+    """
+    Runs queued jobs from the job table on a pool of local worker threads.
+    Jobs are claimed with a single conditional UPDATE, so several workers (or processes
+    sharing the database file) never run the same job twice. A claimed job is leased to this
+    process: a heartbeat thread renews the lease, and only jobs whose lease has expired
+    (their process died) are requeued.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.handlers: Dict[JobType, JobHandler] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def register(self, job_type: JobType, handler: JobHandler) -> None:
+        self.handlers[job_type] = handler
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self.recover()
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logging.info(f"Started {self.workers} job worker(s).")
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """
+        Wakes an idle worker after a job was enqueued.
+        """
+        self._wakeup.set()
+
+    def recover(self) -> int:
+        """
+        Requeues running jobs whose lease expired because their process died; they resume from
+        their checkpoint. Jobs that already used all their attempts are marked failed instead.
+        """
+        now = datetime.utcnow()
+        expired = (
+            Job.status == JobStatus.RUNNING,
+            or_(Job.heartbeat_at == None, Job.heartbeat_at < now - timedelta(seconds=JOB_LEASE_SECONDS)),
+        )
+        with Session(engine) as session:
+            failed = session.execute(
+                update(Job).where(*expired, Job.attempts >= JOB_MAX_ATTEMPTS)
+                .values(status=JobStatus.FAILED, error="The worker running the job stopped responding", finished_at=now)
+            )
+            requeued = session.execute(
+                update(Job).where(*expired).values(status=JobStatus.QUEUED, claimed_by=None)
+            )
+            session.commit()
+        if failed.rowcount:
+            logging.warning(f"Marked {failed.rowcount} abandoned job(s) as failed after {JOB_MAX_ATTEMPTS} attempts.")
+        if requeued.rowcount:
+            logging.info(f"Requeued {requeued.rowcount} interrupted job(s).")
+        return requeued.rowcount
+
+    def claim_next(self) -> Optional[int]:
+        with Session(engine) as session:
+            row = session.execute(
+                text(
+                    "UPDATE job SET status = :running, attempts = attempts + 1, claimed_by = :worker, "
+                    "heartbeat_at = :now, started_at = COALESCE(started_at, :now) "
+                    "WHERE id = (SELECT id FROM job WHERE status = :queued "
+                    "AND (next_attempt_at IS NULL OR next_attempt_at <= :now) ORDER BY id LIMIT 1) "
+                    "AND status = :queued RETURNING id"
+                ).bindparams(bindparam("now", type_=DateTime)),
+                {
+                    "running": JobStatus.RUNNING.value,
+                    "queued": JobStatus.QUEUED.value,
+                    "worker": self.worker_id,
+                    "now": datetime.utcnow(),
+                },
+            ).first()
+            session.commit()
+        return row[0] if row else None
+
+    def run_job(self, job_id: int) -> None:
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            handler = self.handlers.get(job.job_type)
+            try:
+                if handler is None:
+                    raise RuntimeError(f"No handler registered for {job.job_type}")
+                handler(session, job)
+                job.status = JobStatus.COMPLETED
+                job.error = None
+                job.next_attempt_at = None
+                logging.info(f"Job {job_id} ({job.job_type}) completed: {job.processed_rows} rows.")
+            except Exception as e:
+                session.rollback()
+                job = session.get(Job, job_id)
+                # Checkpointed progress survives the rollback, so a retry resumes where it stopped
+                job.status = JobStatus.QUEUED if job.attempts < JOB_MAX_ATTEMPTS else JobStatus.FAILED
+                job.error = str(e)
+                if job.status == JobStatus.QUEUED:
+                    backoff = JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+                    job.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+                logging.error(f"Job {job_id} ({job.job_type}) failed on attempt {job.attempts}: {e}")
+            if job.status != JobStatus.QUEUED:
+                job.finished_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            if job.status != JobStatus.QUEUED and job.source_path:
+                Path(job.source_path).unlink(missing_ok=True)
+
+    def run_pending(self) -> int:
+        """
+        Runs queued jobs on the calling thread until the queue is empty. Returns the number of jobs run.
+        """
+        count = 0
+        while (job_id := self.claim_next()) is not None:
+            self.run_job(job_id)
+            count += 1
+        return count
+
+    def _heartbeat(self) -> None:
+        while not self._stopping.wait(JOB_HEARTBEAT_INTERVAL_SECONDS):
+            try:
+                with Session(engine) as session:
+                    session.execute(
+                        update(Job)
+                        .where(Job.status == JobStatus.RUNNING, Job.claimed_by == self.worker_id)
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    session.commit()
+                self.recover()
+            except Exception as e:
+                logging.error(f"Could not renew job leases: {e}")
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job_id = self.claim_next()
+            except Exception as e:
+                logging.error(f"Could not claim a job: {e}")
+                job_id = None
+            if job_id is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job_id)
+
+
+job_runner = JobRunner()
@@ -1,18 +1,25 @@
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query, Request, Depends
+from fastapi import FastAPI, HTTPException, Query, Request, Response, Depends, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import json
 import os
 from pydantic import BaseModel
-from typing import List, Dict, Any, Union, Optional, Tuple
+from typing import List, Dict, Any, Union, Optional, Tuple, Iterable
 import sys
 from pathlib import Path
 from enum import Enum  # Import Enum
 import logging
-from datetime import datetime, timedelta  # Import datetime and timedelta
+from datetime import datetime, timedelta, date  # Import datetime and timedelta
 import uuid # Import uuid
-from sqlmodel import Session, select, delete
-from sqlalchemy import inspect, text
+import base64
+import hashlib
+from itertools import islice
+from sqlmodel import Session, select, delete, update
+from sqlalchemy import inspect, text, func, or_, and_, literal_column, case, insert, cast, Integer
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 
 # Configure logging
 logging.basicConfig(
@@ -28,10 +35,19 @@ logging.info(f"Project root: {PROJECT_ROOT}")
 SRC_ROOT = PROJECT_ROOT / "src"
 sys.path.insert(0, str(SRC_ROOT))
 
-from backend.database import create_db_and_tables, engine, get_session
-from backend.models import User, Profile, Transaction, Category, Rule, Budget, PaymentSource, PaymentType, ProfileType, Asset, AssetType, SubscriptionHistory, PaymentTransaction, Role, GeographicPrice, Discount, Proposal, ProposalTarget, UserActivity, ActivityType, AdminSetting, WhitelistedUser
+from backend.database import engine, get_session
+from backend.schema import upgrade_schema, parse_asset_date
+from backend.models import User, Profile, Transaction, Category, Rule, Budget, PaymentSource, PaymentType, ProfileType, Asset, AssetType, AssetSubtype, AssetMonthlyValue, SubscriptionHistory, PaymentTransaction, Role, GeographicPrice, Discount, Proposal, ProposalTarget, UserActivity, ActivityType, ActivityHourlyCount, AdminSetting, WhitelistedUser, Job, JobType, JobStatus
 from backend.processing.rule_engine import RuleEngine
+from backend.processing.fingerprint import transaction_fingerprint
+from backend.responses import FastJSONResponse
+from backend import export
+from backend.cache import response_cache, make_cache_key
+from backend.jobs import job_runner, record_job_progress, JOB_FILES_DIR
+from backend.activity import activity_writer, backfill_activity_counts, ROLLUP_HOUR_FORMAT
+from backend.activity_archive import activity_archiver, iter_archived_activity
 from backend import auth
+from backend import geoip
 from fastapi.security import OAuth2PasswordRequestForm
 
 app = FastAPI()
@@ -48,150 +64,151 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["ETag"],  # Let the frontend read ETags for conditional GETs
 )
 
 
 
 @app.on_event("startup")
 def on_startup():
-    create_db_and_tables()
+    upgrade_schema()
     with Session(engine) as session:
         inspector = inspect(engine)
-        
-        # Check for user table columns
-        if "user" in inspector.get_table_names():
-            user_columns = inspector.get_columns("user")
-            user_column_names = [col['name'] for col in user_columns]
-            
-            if "user_first_name" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN user_first_name VARCHAR(50) DEFAULT 'Default'"))
-                session.commit()
-                logging.info("Added 'user_first_name' column to 'user' table.")
-            
-            if "user_last_name" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN user_last_name VARCHAR(50) DEFAULT 'Default'"))
-                session.commit()
-                logging.info("Added 'user_last_name' column to 'user' table.")
-
-            if "mobile_phone_number" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN mobile_phone_number VARCHAR(20)"))
-                session.commit()
-                logging.info("Added 'mobile_phone_number' column to 'user' table.")
 
-            if "country_code" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN country_code VARCHAR(2)"))
+        # Add default admin settings if not present
+        if "adminsetting" in inspector.get_table_names():
+            default_trial_days_setting = session.exec(select(AdminSetting).where(AdminSetting.key == "DEFAULT_TRIAL_DAYS")).first()
+            if not default_trial_days_setting:
+                session.add(AdminSetting(key="DEFAULT_TRIAL_DAYS", value="30"))
                 session.commit()
-                logging.info("Added 'country_code' column to 'user' table.")
-            
-            if "subscription_expiry_date" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN subscription_expiry_date DATETIME"))
+                logging.info("Added default 'DEFAULT_TRIAL_DAYS' setting to 'adminsetting' table.")
+        
+        if session.exec(select(AssetMonthlyValue.id).limit(1)).first() is None:
+            rebuilt = _backfill_asset_monthly_values(session)
+            if rebuilt:
                 session.commit()
-                logging.info("Added 'subscription_expiry_date' column to 'user' table.")
+                logging.info(f"Built the monthly asset series for {rebuilt} profiles.")
 
-            if "role" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN role VARCHAR(50) DEFAULT 'USER'"))
-                session.commit()
-                logging.info("Added 'role' column to 'user' table.")
-            
-            if "account_creation_time" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN account_creation_time DATETIME"))
-                session.commit()
-                session.execute(text(f"UPDATE user SET account_creation_time = '{datetime.utcnow().isoformat()}' WHERE account_creation_time IS NULL"))
+        # Subtypes moved from the JSON column on assettype to the assetsubtype table
+        if session.exec(select(AssetSubtype.id).limit(1)).first() is None:
+            backfilled = _backfill_asset_subtypes(session)
+            if backfilled:
                 session.commit()
-                logging.info("Added 'account_creation_time' column to 'user' table and populated existing rows.")
+                logging.info(f"Copied {backfilled} asset subtypes into the 'assetsubtype' table.")
 
-            if "account_updated_time" not in user_column_names:
-                session.execute(text("ALTER TABLE user ADD COLUMN account_updated_time DATETIME"))
+        # Hourly activity counters behind the admin activity charts
+        if session.exec(select(ActivityHourlyCount.id).limit(1)).first() is None:
+            backfilled = backfill_activity_counts(session)
+            if backfilled:
                 session.commit()
-                session.execute(text(f"UPDATE user SET account_updated_time = '{datetime.utcnow().isoformat()}' WHERE account_updated_time IS NULL"))
-                session.commit()
-                logging.info("Added 'account_updated_time' column to 'user' table and populated existing rows.")
+                logging.info(f"Built {backfilled} hourly activity counters from 'useractivity'.")
 
-        columns = inspector.get_columns("profile")
-        column_names = [col['name'] for col in columns]
-        if "public_id" not in column_names:
-            session.execute(text("ALTER TABLE profile ADD COLUMN public_id VARCHAR(10)"))
-            session.commit()
-            logging.info("Added 'public_id' column to 'profile' table.")
-            
-            # Generate public_id for existing profiles
-            profiles_without_public_id = session.exec(select(Profile).where(Profile.public_id == None)).all()
-            for profile in profiles_without_public_id:
-                # Generate a simple hash for existing profiles
-                profile.public_id = str(uuid.uuid4().hex[:10]) # Generate a 10-char hex string
-                session.add(profile)
-            session.commit()
-            logging.info(f"Generated public_id for {len(profiles_without_public_id)} existing profiles.")
-        
-        if "is_hidden" not in column_names:
-            session.execute(text("ALTER TABLE profile ADD COLUMN is_hidden BOOLEAN DEFAULT FALSE"))
-            session.commit()
-            logging.info("Added 'is_hidden' column to 'profile' table with default FALSE.")
-        
-        if "profile_type" not in column_names:
-            session.execute(text("ALTER TABLE profile ADD COLUMN profile_type VARCHAR(20) DEFAULT 'EXPENSE_MANAGER'"))
-            session.commit()
-            logging.info("Added 'profile_type' column to 'profile' table with default 'EXPENSE_MANAGER'.")
+    # Start background job workers; jobs abandoned by a dead process resume from their checkpoint once their lease expires
+    job_runner.start()
+    activity_writer.start()
+    activity_archiver.start()
 
-        # Check for useractivity table columns
-        if "useractivity" in inspector.get_table_names():
-            useractivity_columns = inspector.get_columns("useractivity")
-            useractivity_column_names = [col['name'] for col in useractivity_columns]
 
-            if "profile_id" not in useractivity_column_names:
-                session.execute(text("ALTER TABLE useractivity ADD COLUMN profile_id INTEGER"))
-                session.commit()
-                logging.info("Added 'profile_id' column to 'useractivity' table.")
-            
-            if "country_code" not in useractivity_column_names:
-                session.execute(text("ALTER TABLE useractivity ADD COLUMN country_code VARCHAR(2)"))
-                session.commit()
-                logging.info("Added 'country_code' column to 'useractivity' table.")
-        
-        # Add default admin settings if not present
-        if "adminsetting" in inspector.get_table_names():
-            default_trial_days_setting = session.exec(select(AdminSetting).where(AdminSetting.key == "DEFAULT_TRIAL_DAYS")).first()
-            if not default_trial_days_setting:
-                session.add(AdminSetting(key="DEFAULT_TRIAL_DAYS", value="30"))
-                session.commit()
-                logging.info("Added default 'DEFAULT_TRIAL_DAYS' setting to 'adminsetting' table.")
-        
-        # Ensure whitelisteduser table is created
-        if "whitelisteduser" not in inspector.get_table_names():
-            # SQLModel will create the table if it doesn't exist during create_db_and_tables()
-            # But if it was added later, we might need a migration.
-            # For now, assume create_db_and_tables() handles it on first run.
-            logging.info("WhitelistedUser table check. Assuming create_db_and_tables() handles creation.")
-
-def log_activity(request: Request, session: Session, user_id: int, activity_type: ActivityType, profile_id: Optional[int] = None):
+@app.on_event("shutdown")
+def on_shutdown():
+    job_runner.stop()
+    activity_archiver.stop()
+    activity_writer.stop()  # Writes events still queued
+
+def log_activity(request: Request, user_id: int, activity_type: ActivityType, profile_id: Optional[int] = None):
+    """
+    Queues a user activity event; the background activity writer stores it in batches.
+    """
     ip_address = request.client.host if request.client else None
     country_code = _get_country_code_from_ip(ip_address) # Get country code
-    user_activity = UserActivity(user_id=user_id, activity_type=activity_type, ip_address=ip_address, profile_id=profile_id, country_code=country_code)
-    session.add(user_activity)
-    session.commit()
-    session.refresh(user_activity)
+    activity_writer.enqueue({
+        "user_id": user_id,
+        "activity_type": activity_type,
+        "timestamp": datetime.utcnow(),
+        "ip_address": ip_address,
+        "profile_id": profile_id,
+        "country_code": country_code,
+    })
     logging.info(f"User activity logged: User ID {user_id}, Type: {activity_type}, IP: {ip_address}, Country: {country_code}, Profile ID: {profile_id}")
 
 def _get_country_code_from_ip(ip_address: Optional[str]) -> Optional[str]:
     """
-    Placeholder function to get country code from IP address.
-    In a real application, this would integrate with a GeoIP database or API.
-    For now, it returns a default or None.
-    """
-    if not ip_address or ip_address == "127.0.0.1" or ip_address == "localhost":
-        return "US" # Default to US for local development
-    # Example of a simple mapping (not robust for production)
-    if ip_address.startswith("192.168."):
-        return "US"
-    # In a real scenario, you'd use a library like geoip2 or make an API call
-    # For example:
-    # try:
-    #     reader = geoip2.database.Reader('/path/to/GeoLite2-Country.mmdb')
-    #     response = reader.country(ip_address)
-    #     return response.country.iso_code
-    # except Exception:
-    #     return None
-    return "US" # Fallback or integrate with a real service
+    Country code of the client's IP address, from the local GeoIP database (see backend/geoip.py).
+    None for local and unknown addresses, unless GEOIP_DEFAULT_COUNTRY is set.
+    """
+    return geoip.country_code_for_ip(ip_address)
+
+def bump_profile_data_version(session: Session, profile_id: Optional[int]) -> None:
+    """
+    Increments the profile's data version in the current transaction.
+    Call it before committing any write to the profile's transactions, assets, settings or payment sources.
+    """
+    if profile_id is None:
+        return
+    session.execute(
+        update(Profile).where(Profile.id == profile_id).values(data_version=Profile.data_version + 1)
+    )
+    # Entries for the old version can no longer be hit; drop them eagerly to free the slots
+    response_cache.invalidate_profile(profile_id)
+
+
+def _profile_etag(request: Request, profile: Profile, *extra: Any) -> str:
+    """
+    Weak ETag for a profile read endpoint: the profile's data version plus a digest of the
+    request path, query string and any extra inputs the response depends on.
+    """
+    key = json.dumps([request.url.path, sorted(request.query_params.multi_items()), [str(e) for e in extra]])
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return f'W/"{profile.id}-{profile.data_version}-{digest}"'
+
+
+def _not_modified_response(request: Request, etag: str) -> Optional[Response]:
+    """
+    Returns a 304 response when the request's If-None-Match header matches the ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def _check_profile_etag(
+    request: Request, response: Response, session: Session, profile_id: int, *extra: Any
+) -> Optional[Response]:
+    """
+    Conditional GET for profile read endpoints. Returns a 304 response when the client's
+    copy is current; otherwise sets the ETag header on `response` and returns None.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        return None
+    etag = _profile_etag(request, profile, *extra)
+    not_modified = _not_modified_response(request, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+    return None
+
+
+def _response_cache_key(request: Request, session: Session, profile_id: int, *extra: Any) -> Optional[str]:
+    """
+    Response cache key for a profile aggregation endpoint: the profile's data version plus
+    the request path, query string and any extra inputs the response depends on.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        return None
+    return make_cache_key(
+        profile_id,
+        profile.data_version,
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        [str(e) for e in extra],
+    )
+
 
 # Pydantic models for user authentication
 class UserCreate(BaseModel):
@@ -223,18 +240,30 @@ class PasswordReset(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 
-@app.post("/api/users/signup", response_model=User)
-def create_user(user: UserCreate, request: Request, session: Session = Depends(get_session)):
-    db_user = auth.get_user(session, email=user.email)
-    if db_user:
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+def _find_user_by_email(session: Session, email: str) -> Optional[User]:
+    """
+    Looks up a user by email and closes the session, returning its connection to the pool before
+    the password is hashed. The returned user is detached with its columns loaded.
+    """
+    user = auth.get_user(session, email=email)
+    session.close()
+    return user
+
+
+def _create_user_record(session: Session, user: UserCreate, hashed_password: str, ip_address: Optional[str]) -> User:
+    """
+    Stores a new user on a trial subscription and records the trial in the subscription history.
+    """
+    if auth.get_user(session, email=user.email):  # Registered while the password was being hashed
         raise HTTPException(status_code=400, detail="Email already registered")
-    if len(user.password) > 72:
-        raise HTTPException(status_code=400, detail="Password must be 72 characters or fewer.")
-    
-    hashed_password = auth.get_password_hash(user.password)
-    
+
     # Get default trial days from AdminSetting
     default_trial_days_setting = session.exec(select(AdminSetting).where(AdminSetting.key == "DEFAULT_TRIAL_DAYS")).first()
     trial_days = int(default_trial_days_setting.value) if default_trial_days_setting else 30 # Default to 30 if not set
@@ -243,7 +272,6 @@ def create_user(user: UserCreate, request: Request, session: Session = Depends(g
     trial_expiry_date = now + timedelta(days=trial_days)
 
     # Determine country code from IP address
-    ip_address = request.client.host if request.client else None
     country_code = _get_country_code_from_ip(ip_address)
 
     db_user = User(
@@ -259,8 +287,6 @@ def create_user(user: UserCreate, request: Request, session: Session = Depends(g
     session.commit()
     session.refresh(db_user) # Get the user ID
 
-    log_activity(request, session, db_user.id, ActivityType.USER_SIGNED_UP)
-
     # Create subscription history record
     trial_history = SubscriptionHistory(
         user_id=db_user.id,
@@ -272,25 +298,73 @@ def create_user(user: UserCreate, request: Request, session: Session = Depends(g
     session.add(trial_history)
     session.commit()
     session.refresh(db_user)
+    return db_user
+
+
+def _complete_login(session: Session, user_id: int, new_hash: Optional[str]) -> str:
+    """
+    Stores an upgraded password hash if there is one and issues a refresh token; returns the token.
+    """
+    if new_hash:
+        # The stored hash used a different work factor than BCRYPT_ROUNDS; upgrade it now that we know the password
+        session.execute(update(User).where(User.id == user_id).values(hashed_password=new_hash))
+        auth.invalidate_cached_user(user_id)
+        logging.info(f"Rehashed password for user ID {user_id} with {auth.BCRYPT_ROUNDS} rounds.")
+    refresh_token = auth.issue_refresh_token(session, user_id)
+    session.commit()
+    return refresh_token
+
+
+# Signup and login are async so that a request waiting for bcrypt holds neither a worker thread
+# nor a database connection; their database work runs on the threadpool.
+@app.post("/api/users/signup", response_model=User)
+async def create_user(user: UserCreate, request: Request, session: Session = Depends(get_session)):
+    db_user = await run_in_threadpool(_find_user_by_email, session, user.email)
+    if db_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if len(user.password) > 72:
+        raise HTTPException(status_code=400, detail="Password must be 72 characters or fewer.")
+    
+    # bcrypt runs on the bounded password hashing pool
+    hashed_password = await auth.get_password_hash_async(user.password)
 
+    ip_address = request.client.host if request.client else None
+    db_user = await run_in_threadpool(_create_user_record, session, user, hashed_password, ip_address)
+    log_activity(request, db_user.id, ActivityType.USER_SIGNED_UP)
     return db_user
 
 
 @app.post("/api/users/login", response_model=Token)
-def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = auth.get_user(session, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+    user = await run_in_threadpool(_find_user_by_email, session, form_data.username)
+    valid, new_hash = await auth.verify_and_update_password_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=400,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    log_activity(request, session, user.id, ActivityType.USER_LOGGED_IN) # Log user login activity
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = auth.create_user_access_token(user)
+    refresh_token = await run_in_threadpool(_complete_login, session, user.id, new_hash)
+    log_activity(request, user.id, ActivityType.USER_LOGGED_IN) # Log user login activity
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@app.post("/api/users/token/refresh", response_model=Token)
+def refresh_access_token(token_request: RefreshTokenRequest, session: Session = Depends(get_session)):
+    """
+    Issues a new access token and a rotated refresh token without checking the password.
+    """
+    user, refresh_token = auth.rotate_refresh_token(session, token_request.refresh_token)
+    return {"access_token": auth.create_user_access_token(user), "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@app.post("/api/users/logout")
+def logout(token_request: RefreshTokenRequest, request: Request, session: Session = Depends(get_session)):
+    user_id = auth.revoke_refresh_token(session, token_request.refresh_token)
+    if user_id is not None:
+        log_activity(request, user_id, ActivityType.USER_LOGGED_OUT)
+    return {"message": "Logged out successfully"}
 
 
 @app.get("/api/users/me", response_model=UserResponse)
@@ -327,9 +401,10 @@ def update_users_me(user_update: UserUpdate, request: Request, current_user: Use
     
     session.add(current_user)
     session.commit()
+    auth.invalidate_cached_user(current_user.id)
     session.refresh(current_user)
     
-    log_activity(request, session, current_user.id, ActivityType.USER_PROFILE_UPDATED, profile_id=None)
+    log_activity(request, current_user.id, ActivityType.USER_PROFILE_UPDATED, profile_id=None)
 
     is_premium = False
     if current_user.subscription_expiry_date:
@@ -342,7 +417,8 @@ def update_users_me(user_update: UserUpdate, request: Request, current_user: Use
         user_last_name=current_user.user_last_name,
         mobile_phone_number=current_user.mobile_phone_number,
         subscription_expiry_date=current_user.subscription_expiry_date,
-        is_premium=is_premium
+        is_premium=is_premium,
+        role=current_user.role
     )
 
 
@@ -357,9 +433,11 @@ def change_password_me(password_reset: PasswordReset, request: Request, current_
 
     current_user.hashed_password = auth.get_password_hash(password_reset.new_password)
     session.add(current_user)
+    auth.revoke_user_refresh_tokens(session, current_user.id)  # Sign out other sessions
     session.commit()
+    auth.invalidate_cached_user(current_user.id)
     session.refresh(current_user)
-    log_activity(request, session, current_user.id, ActivityType.USER_PASSWORD_CHANGED)
+    log_activity(request, current_user.id, ActivityType.USER_PASSWORD_CHANGED)
     return {"message": "Password updated successfully"}
 
 
@@ -407,6 +485,7 @@ def subscribe(subscription: SubscriptionCreate, request: Request, session: Sessi
     current_user.subscription_expiry_date = end_date
     session.add(current_user)
     session.commit()
+    auth.invalidate_cached_user(current_user.id)
 
     # Create subscription history record
     history = SubscriptionHistory(
@@ -425,7 +504,7 @@ def subscribe(subscription: SubscriptionCreate, request: Request, session: Sessi
     session.add(payment)
     session.commit()
 
-    log_activity(request, session, current_user.id, ActivityType.USER_SUBSCRIBED)
+    log_activity(request, current_user.id, ActivityType.USER_SUBSCRIBED)
 
     # Return updated user status
     return UserResponse(
@@ -435,7 +514,8 @@ def subscribe(subscription: SubscriptionCreate, request: Request, session: Sessi
         user_last_name=current_user.user_last_name,
         mobile_phone_number=current_user.mobile_phone_number,
         subscription_expiry_date=current_user.subscription_expiry_date,
-        is_premium=True
+        is_premium=True,
+        role=current_user.role
     )
 
 @app.get("/api/users/me/subscription_history", response_model=List[SubscriptionHistory])
@@ -519,9 +599,10 @@ def create_payment_source(
     db_payment_source = PaymentSource.model_validate(payment_source)
     db_payment_source.source_name = processed_source_name # Assign the processed name
     session.add(db_payment_source)
+    bump_profile_data_version(session, payment_source.profile_id)
     session.commit()
     session.refresh(db_payment_source)
-    log_activity(request, session, current_user.id, ActivityType.PAYMENT_SOURCE_CREATED, profile_id=payment_source.profile_id)
+    log_activity(request, current_user.id, ActivityType.PAYMENT_SOURCE_CREATED, profile_id=payment_source.profile_id)
     return db_payment_source
 
 
@@ -547,8 +628,9 @@ def delete_payment_source(
     if not payment_source:
         raise HTTPException(status_code=404, detail="Payment Source not found")
     session.delete(payment_source)
+    bump_profile_data_version(session, payment_source.profile_id)
     session.commit()
-    log_activity(request, session, current_user.id, ActivityType.PAYMENT_SOURCE_DELETED, profile_id=payment_source.profile_id)
+    log_activity(request, current_user.id, ActivityType.PAYMENT_SOURCE_DELETED, profile_id=payment_source.profile_id)
     return {"message": "Payment Source deleted successfully"}
 
 
@@ -558,29 +640,313 @@ def create_transaction(
 ):
     db_transaction = Transaction.model_validate(transaction)
     session.add(db_transaction)
+    bump_profile_data_version(session, transaction.profile_id)
     session.commit()
     session.refresh(db_transaction)
-    log_activity(request, session, current_user.id, ActivityType.TRANSACTION_RECORDED, profile_id=transaction.profile_id)
+    log_activity(request, current_user.id, ActivityType.TRANSACTION_RECORDED, profile_id=transaction.profile_id)
     return db_transaction
 
 
-@app.post("/api/transactions/bulk", response_model=List[Transaction])
+@app.post("/api/transactions/bulk", response_model=List[Transaction], response_class=FastJSONResponse)
 def create_transactions_bulk(
     transaction_list: TransactionCreateList, request: Request, session: Session = Depends(get_session), current_user: User = Depends(auth.get_current_active_user)
 ):
-    created_transactions = []
-    for transaction_data in transaction_list.transactions:
-        db_transaction = Transaction.model_validate(transaction_data)
-        session.add(db_transaction)
-        created_transactions.append(db_transaction)
-    
+    """
+    Creates many transactions with one INSERT ... RETURNING statement.
+    Rows without a category are categorized with the profile's rules before insert.
+    Rows that duplicate an already imported transaction are skipped and not returned.
+    """
+    if not transaction_list.transactions:
+        return FastJSONResponse([])
+    rows = [t.model_dump() for t in transaction_list.transactions]
+    created_transactions = _insert_transaction_rows(session, rows)
+
+    for profile_id in {t.profile_id for t in transaction_list.transactions}:
+        bump_profile_data_version(session, profile_id)
     session.commit()
-    
-    for db_transaction in created_transactions:
-        session.refresh(db_transaction)
-    
-    log_activity(request, session, current_user.id, ActivityType.TRANSACTION_BULK_UPLOADED, profile_id=transaction_list.transactions[0].profile_id)
-    return created_transactions
+
+    log_activity(request, current_user.id, ActivityType.TRANSACTION_BULK_UPLOADED, profile_id=transaction_list.transactions[0].profile_id)
+    return FastJSONResponse(created_transactions)
+
+
+# Column layout of bank statement CSVs, as in consolidated_expenses.csv
+TRANSACTION_CSV_COLUMNS = {
+    "Date": "date",
+    "Payment Source": "payment_source",
+    "Description": "description",
+    "Amount": "amount",
+}
+TRANSACTION_CSV_CHUNK_SIZE = 1000
+
+
+def _read_transaction_csv(source: Any, chunk_size: int = TRANSACTION_CSV_CHUNK_SIZE):
+    """
+    Opens a transaction CSV (path or file object) as an iterator of DataFrame chunks.
+    Raises ValueError when the header does not contain the expected columns.
+    """
+    return pd.read_csv(
+        source,
+        usecols=list(TRANSACTION_CSV_COLUMNS),
+        dtype={"Date": str, "Payment Source": str, "Description": str},
+        chunksize=chunk_size,
+    )
+
+
+def _transaction_rows_from_csv_chunk(chunk: pd.DataFrame, profile_id: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Converts a CSV chunk to transaction rows for _insert_transaction_rows.
+    Rows without a date or a numeric amount are skipped; returns (rows, skipped_count).
+    """
+    chunk = chunk.rename(columns=TRANSACTION_CSV_COLUMNS)
+    chunk["amount"] = pd.to_numeric(chunk["amount"], errors="coerce")
+    valid = chunk["date"].notna() & chunk["amount"].notna()
+    chunk = chunk[valid].fillna({"description": "", "payment_source": ""})
+    chunk = chunk.assign(category=None, subcategory=None, profile_id=profile_id)
+    return chunk.to_dict(orient="records"), int((~valid).sum())
+
+
+def _import_transaction_csv(upload: UploadFile, reader, profile_id: int, user_id: int, request: Request):
+    """
+    Inserts a CSV upload chunk by chunk, committing each chunk in its own transaction,
+    and yields one NDJSON progress line per chunk. Only one chunk is held in memory at a time.
+    """
+    inserted = skipped = duplicates = chunks = 0
+    occurrences: Dict[str, int] = {}  # Fingerprint ordinals carry across chunks of the same file
+    # The request-scoped session may already be closed while the body streams
+    with Session(engine) as session:
+        try:
+            for chunk in reader:
+                rows, chunk_skipped = _transaction_rows_from_csv_chunk(chunk, profile_id)
+                created = _insert_transaction_rows(session, rows, occurrences)
+                bump_profile_data_version(session, profile_id)
+                session.commit()
+                chunks += 1
+                inserted += len(created)
+                skipped += chunk_skipped
+                duplicates += len(rows) - len(created)
+                yield json.dumps(
+                    {"status": "chunk_committed", "chunk": chunks, "rows": len(created), "skipped": chunk_skipped, "duplicates": len(rows) - len(created), "inserted": inserted}
+                ) + "\n"
+        except Exception as e:
+            session.rollback()
+            logging.error(f"CSV import for profile {profile_id} failed in chunk {chunks + 1}: {e}")
+            yield json.dumps(
+                {"status": "failed", "chunk": chunks + 1, "detail": str(e), "inserted": inserted}
+            ) + "\n"
+            return
+        finally:
+            reader.close()
+            upload.file.close()
+
+        log_activity(request, user_id, ActivityType.TRANSACTION_BULK_UPLOADED, profile_id=profile_id)
+    logging.info(f"CSV import for profile {profile_id} finished: {inserted} inserted, {skipped} skipped, {duplicates} duplicates in {chunks} chunks.")
+    yield json.dumps({"status": "completed", "chunks": chunks, "inserted": inserted, "skipped": skipped, "duplicates": duplicates}) + "\n"
+
+
+@app.post("/api/transactions/upload_csv")
+def upload_transactions_csv(
+    profile_id: int,
+    request: Request,
+    file: UploadFile = File(...),
+    chunk_size: int = Query(TRANSACTION_CSV_CHUNK_SIZE, ge=1, le=10000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Imports a bank statement CSV (Date, Payment Source, Description, Amount).
+    The file is parsed, categorized and committed in chunks; the response streams one
+    NDJSON progress line per committed chunk followed by a final summary line.
+    A failure stops the import; chunks committed before it are kept.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    try:
+        reader = _read_transaction_csv(file.file, chunk_size)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+
+    return StreamingResponse(
+        _import_transaction_csv(file, reader, profile_id, current_user.id, request),
+        media_type="application/x-ndjson",
+    )
+
+
+class JobResponse(BaseModel):
+    id: int
+    job_type: JobType
+    status: JobStatus
+    profile_id: int
+    checkpoint: int
+    processed_rows: int
+    total_rows: Optional[int] = None
+    attempts: int
+    error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+def _run_import_csv_job(session: Session, job: Job) -> None:
+    """
+    Imports the job's stored CSV chunk by chunk, committing each chunk together with the job checkpoint.
+    Chunks consumed by earlier attempts are only fingerprinted (to keep occurrence ordinals
+    consistent) and not inserted again; fingerprints also make any overlap harmless.
+    """
+    occurrences: Dict[str, int] = {}
+    consumed = 0
+    with _read_transaction_csv(job.source_path, job.chunk_size) as reader:
+        for chunk in reader:
+            rows, _ = _transaction_rows_from_csv_chunk(chunk, job.profile_id)
+            consumed += len(chunk)
+            if consumed <= job.checkpoint:
+                for row in rows:
+                    transaction_fingerprint(row, occurrences)
+                continue
+            created = _insert_transaction_rows(session, rows, occurrences)
+            bump_profile_data_version(session, job.profile_id)
+            record_job_progress(session, job, consumed, job.processed_rows + len(created))
+            session.commit()
+
+
+def _run_recategorize_job(session: Session, job: Job) -> None:
+    """
+    Re-applies the profile's rules to all of its transactions in id order, one chunk per commit.
+    The checkpoint is the last transaction id processed.
+    """
+    profile = session.get(Profile, job.profile_id)
+    if not profile:
+        raise ValueError(f"Profile {job.profile_id} not found")
+    rule_engine = RuleEngine(settings_data=_load_profile_settings(session, profile))
+    while True:
+        transactions = session.exec(
+            select(Transaction)
+            .where(Transaction.profile_id == job.profile_id, Transaction.id > job.checkpoint)
+            .order_by(Transaction.id)
+            .limit(job.chunk_size)
+        ).all()
+        if not transactions:
+            break
+        if _categorize_transactions(rule_engine, transactions):
+            bump_profile_data_version(session, job.profile_id)
+        record_job_progress(session, job, transactions[-1].id, job.processed_rows + len(transactions))
+        session.commit()
+
+
+job_runner.register(JobType.IMPORT_CSV, _run_import_csv_job)
+job_runner.register(JobType.RECATEGORIZE, _run_recategorize_job)
+
+
+def _get_user_job(session: Session, job_id: int, user: User) -> Job:
+    job = session.get(Job, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/jobs/import_csv", response_model=JobResponse, status_code=202)
+def enqueue_import_csv_job(
+    profile_id: int,
+    request: Request,
+    file: UploadFile = File(...),
+    chunk_size: int = Query(TRANSACTION_CSV_CHUNK_SIZE, ge=1, le=10000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Stores a bank statement CSV and queues a background import job for it.
+    Poll GET /api/jobs/{job_id} for progress.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    JOB_FILES_DIR.mkdir(parents=True, exist_ok=True)
+    source_path = JOB_FILES_DIR / f"{uuid.uuid4()}.csv"
+    line_count = 0
+    last_block = b""
+    with open(source_path, "wb") as f:
+        while block := file.file.read(1024 * 1024):
+            f.write(block)
+            line_count += block.count(b"\n")
+            last_block = block
+    if last_block and not last_block.endswith(b"\n"):
+        line_count += 1
+    try:
+        _read_transaction_csv(source_path).close()
+    except (ValueError, pd.errors.ParserError) as e:
+        source_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+
+    job = Job(
+        job_type=JobType.IMPORT_CSV,
+        profile_id=profile_id,
+        user_id=current_user.id,
+        source_path=str(source_path),
+        chunk_size=chunk_size,
+        total_rows=max(line_count - 1, 0),  # Approximate: excludes the header, counts quoted line breaks
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    job_runner.notify()
+    log_activity(request, current_user.id, ActivityType.TRANSACTION_BULK_UPLOADED, profile_id=profile_id)
+    return job
+
+
+@app.post("/api/jobs/recategorize", response_model=JobResponse, status_code=202)
+def enqueue_recategorize_job(
+    profile_id: int,
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Queues a background job that re-applies the profile's rules to all of its transactions.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    total_rows = session.exec(
+        select(func.count(Transaction.id)).where(Transaction.profile_id == profile_id)
+    ).one()
+    job = Job(
+        job_type=JobType.RECATEGORIZE,
+        profile_id=profile_id,
+        user_id=current_user.id,
+        chunk_size=chunk_size,
+        total_rows=total_rows,
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    job_runner.notify()
+    return job
+
+
+@app.get("/api/jobs", response_model=List[JobResponse])
+def get_jobs(
+    profile_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Lists the current user's 50 most recent jobs, optionally for a single profile.
+    """
+    statement = select(Job).where(Job.user_id == current_user.id)
+    if profile_id is not None:
+        statement = statement.where(Job.profile_id == profile_id)
+    return session.exec(statement.order_by(Job.id.desc()).limit(50)).all()
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    return _get_user_job(session, job_id, current_user)
 
 
 @app.delete("/api/transactions/{transaction_id}")
@@ -595,8 +961,9 @@ def delete_transaction(
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     session.delete(transaction)
+    bump_profile_data_version(session, profile_id)
     session.commit()
-    log_activity(request, session, current_user.id, ActivityType.TRANSACTION_DELETED, profile_id=profile_id)
+    log_activity(request, current_user.id, ActivityType.TRANSACTION_DELETED, profile_id=profile_id)
     return {"message": "Transaction deleted successfully"}
 
 
@@ -660,7 +1027,7 @@ def create_profile(profile: ProfileCreate, request: Request, session: Session =
     session.add(db_profile)
     session.commit()
     session.refresh(db_profile)
-    log_activity(request, session, current_user.id, ActivityType.PROFILE_CREATED, profile_id=db_profile.id)
+    log_activity(request, current_user.id, ActivityType.PROFILE_CREATED, profile_id=db_profile.id)
     return db_profile
 
 
@@ -679,7 +1046,7 @@ def get_profile(profile_id: int, request: Request, session: Session = Depends(ge
     profile = session.get(Profile, profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    # log_activity(session, current_user.id, ActivityType.PROFILE_VIEWED, request, profile_id=profile.id)
+    # log_activity(request, current_user.id, ActivityType.PROFILE_VIEWED, profile_id=profile.id)
     return profile
 
 
@@ -690,7 +1057,7 @@ def delete_profile(profile_id: int, request: Request, session: Session = Depends
         raise HTTPException(status_code=404, detail="Profile not found")
     session.delete(profile)
     session.commit()
-    log_activity(request, session, current_user.id, ActivityType.PROFILE_DELETED, profile_id=profile_id)
+    log_activity(request, current_user.id, ActivityType.PROFILE_DELETED, profile_id=profile_id)
     return {"message": "Profile deleted successfully"}
 
 
@@ -715,9 +1082,9 @@ def update_profile(
     if profile_update.is_hidden is not None:
         if profile.is_hidden != profile_update.is_hidden:
             if profile_update.is_hidden:
-                log_activity(request, session, current_user.id, ActivityType.PROFILE_HIDDEN, profile_id=profile.id)
+                log_activity(request, current_user.id, ActivityType.PROFILE_HIDDEN, profile_id=profile.id)
             else:
-                log_activity(request, session, current_user.id, ActivityType.PROFILE_UNHIDDEN, profile_id=profile.id)
+                log_activity(request, current_user.id, ActivityType.PROFILE_UNHIDDEN, profile_id=profile.id)
         profile.is_hidden = profile_update.is_hidden
         activity_logged = True
     if profile_update.profile_type is not None:
@@ -725,10 +1092,11 @@ def update_profile(
         activity_logged = True
 
     session.add(profile)
+    bump_profile_data_version(session, profile.id)
     session.commit()
     session.refresh(profile)
     if activity_logged and (profile_update.name is not None or profile_update.currency is not None or profile_update.profile_type is not None):
-        log_activity(request, session, current_user.id, ActivityType.PROFILE_UPDATED, profile_id=profile.id)
+        log_activity(request, current_user.id, ActivityType.PROFILE_UPDATED, profile_id=profile.id)
     return profile
 
 
@@ -783,6 +1151,46 @@ class AssetUpdate(BaseModel):
 
 
 # API Endpoints for Asset Types
+def _decode_legacy_subtypes(value: Optional[str]) -> List[str]:
+    """
+    Decodes the legacy AssetType.subtypes JSON string, which older clients stored double-encoded.
+    """
+    subtypes = json.loads(value) if value else []
+    if isinstance(subtypes, str):
+        subtypes = json.loads(subtypes)
+    return subtypes
+
+
+def _set_asset_subtypes(session: Session, db_asset_type: AssetType, subtypes: List[str]) -> List[str]:
+    """
+    Replaces the subtype rows of an asset type, keeping the given order and dropping repeats.
+    The legacy JSON column is kept in sync. Returns the stored subtype names.
+    """
+    subtypes = list(dict.fromkeys(subtypes))
+    db_asset_type.subtypes = json.dumps(subtypes)
+    session.execute(delete(AssetSubtype).where(AssetSubtype.asset_type_id == db_asset_type.id))
+    if subtypes:
+        session.execute(insert(AssetSubtype), [
+            {"asset_type_id": db_asset_type.id, "name": name, "position": position}
+            for position, name in enumerate(subtypes)
+        ])
+    return subtypes
+
+
+def _backfill_asset_subtypes(session: Session) -> int:
+    """
+    Copies subtypes from the legacy JSON column into the assetsubtype table. Returns the number of rows created.
+    """
+    rows = [
+        {"asset_type_id": asset_type_id, "name": name, "position": position}
+        for asset_type_id, value in session.execute(select(AssetType.id, AssetType.subtypes))
+        for position, name in enumerate(dict.fromkeys(_decode_legacy_subtypes(value)))
+    ]
+    if rows:
+        session.execute(insert(AssetSubtype), rows)
+    return len(rows)
+
+
 @app.post("/api/asset_types", response_model=AssetTypeResponse)
 def create_asset_type(
     asset_type: AssetTypeCreate, request: Request, session: Session = Depends(get_session), current_user: User = Depends(auth.get_current_active_user)
@@ -790,49 +1198,39 @@ def create_asset_type(
     db_asset_type = AssetType(
         profile_id=asset_type.profile_id,
         name=asset_type.name,
-        subtypes=json.dumps(asset_type.subtypes)
     )
     session.add(db_asset_type)
+    subtypes = _set_asset_subtypes(session, db_asset_type, asset_type.subtypes)
+    bump_profile_data_version(session, asset_type.profile_id)
     session.commit()
-    session.refresh(db_asset_type)
-    log_activity(request, session, current_user.id, ActivityType.ASSET_TYPE_CREATED, profile_id=asset_type.profile_id)
+    log_activity(request, current_user.id, ActivityType.ASSET_TYPE_CREATED, profile_id=asset_type.profile_id)
     return AssetTypeResponse(
         id=db_asset_type.id,
         profile_id=db_asset_type.profile_id,
         name=db_asset_type.name,
-        subtypes=json.loads(db_asset_type.subtypes) if db_asset_type.subtypes else []
+        subtypes=subtypes
     )
 
 
-@app.get("/api/profiles/{profile_id}/asset_types", response_model=List[AssetTypeResponse])
+@app.get("/api/profiles/{profile_id}/asset_types", response_model=List[AssetTypeResponse], response_class=FastJSONResponse)
 def get_asset_types_for_profile(
     profile_id: int, session: Session = Depends(get_session)
 ):
-
-    try:
-        asset_types = session.exec(
-            select(AssetType).where(AssetType.profile_id == profile_id)
-        ).all()
-        response_asset_types = []
-        for at in asset_types:
-            logging.info(f"Before json.loads: at.subtypes type={type(at.subtypes)}, value={at.subtypes}")
-            # Handle double-encoded JSON string
-            temp_subtypes = json.loads(at.subtypes) if at.subtypes else "[]"
-            parsed_subtypes = json.loads(temp_subtypes) if isinstance(temp_subtypes, str) else temp_subtypes
-            logging.info(f"After json.loads: parsed_subtypes type={type(parsed_subtypes)}, value={parsed_subtypes}")
-            logging.info(f"Before AssetTypeResponse: parsed_subtypes type={type(parsed_subtypes)}, value={parsed_subtypes}")
-            response_asset_types.append(
-                AssetTypeResponse(
-                    id=at.id,
-                    profile_id=at.profile_id,
-                    name=at.name,
-                    subtypes=parsed_subtypes
-                )
-            )
-        return response_asset_types
-    except Exception as e:
-        logging.error(f"Error fetching asset types for profile {profile_id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+    asset_types = {
+        row.id: {"id": row.id, "profile_id": row.profile_id, "name": row.name, "subtypes": []}
+        for row in session.execute(
+            select(AssetType.id, AssetType.profile_id, AssetType.name).where(AssetType.profile_id == profile_id)
+        )
+    }
+    subtypes = session.execute(
+        select(AssetSubtype.asset_type_id, AssetSubtype.name)
+        .join(AssetType, AssetType.id == AssetSubtype.asset_type_id)
+        .where(AssetType.profile_id == profile_id)
+        .order_by(AssetSubtype.asset_type_id, AssetSubtype.position)
+    )
+    for asset_type_id, name in subtypes:
+        asset_types[asset_type_id]["subtypes"].append(name)
+    return FastJSONResponse(list(asset_types.values()))
 
 
 @app.put("/api/asset_types/{asset_type_id}", response_model=AssetTypeResponse)
@@ -848,21 +1246,24 @@ def update_asset_type(
         raise HTTPException(status_code=404, detail="Asset Type not found")
 
     update_data = asset_type_update.model_dump(exclude_unset=True)
+    if "name" in update_data:
+        db_asset_type.name = update_data["name"]
     if "subtypes" in update_data:
-        update_data["subtypes"] = json.dumps(update_data["subtypes"])
-    
-    for key, value in update_data.items():
-        setattr(db_asset_type, key, value)
+        subtypes = _set_asset_subtypes(session, db_asset_type, update_data["subtypes"] or [])
+    else:
+        subtypes = list(session.exec(
+            select(AssetSubtype.name).where(AssetSubtype.asset_type_id == asset_type_id).order_by(AssetSubtype.position)
+        ).all())
 
     session.add(db_asset_type)
+    bump_profile_data_version(session, db_asset_type.profile_id)
     session.commit()
-    session.refresh(db_asset_type)
-    log_activity(request, session, current_user.id, ActivityType.ASSET_TYPE_UPDATED, profile_id=db_asset_type.profile_id)
+    log_activity(request, current_user.id, ActivityType.ASSET_TYPE_UPDATED, profile_id=db_asset_type.profile_id)
     return AssetTypeResponse(
         id=db_asset_type.id,
         profile_id=db_asset_type.profile_id,
         name=db_asset_type.name,
-        subtypes=json.loads(db_asset_type.subtypes) if db_asset_type.subtypes else []
+        subtypes=subtypes
     )
 
 
@@ -874,8 +1275,9 @@ def delete_asset_type(
     if not asset_type:
         raise HTTPException(status_code=404, detail="Asset Type not found")
     session.delete(asset_type)
+    bump_profile_data_version(session, asset_type.profile_id)
     session.commit()
-    log_activity(request, session, current_user.id, ActivityType.ASSET_TYPE_DELETED, profile_id=asset_type.profile_id)
+    log_activity(request, current_user.id, ActivityType.ASSET_TYPE_DELETED, profile_id=asset_type.profile_id)
     return {"message": "Asset Type deleted successfully"}
 
 
@@ -883,193 +1285,368 @@ def delete_asset_type(
 class AssetCreateList(BaseModel):
     assets: List[AssetCreate]
 
-@app.post("/api/assets", response_model=List[AssetResponse])
-def create_assets_bulk(
-    asset_list: AssetCreateList, request: Request, session: Session = Depends(get_session), current_user: User = Depends(auth.get_current_active_user)
-):
-    created_or_updated_assets = []
-    errors = []
+def _asset_snapshot_key(profile_id: int, date: str, asset_type_id: Optional[str], asset_subtype_name: Optional[str]) -> tuple:
+    """
+    Natural key of an asset snapshot, matching the ux_asset_snapshot index.
+    """
+    return (profile_id, date, asset_type_id, asset_subtype_name or "")
 
-    for asset_data in asset_list.assets:
-        try:
-            # Check if an asset with the same unique combination already exists
-            existing_asset = session.exec(
-                select(Asset).where(
-                    Asset.profile_id == asset_data.profile_id,
-                    Asset.date == asset_data.date,
-                    Asset.asset_type_id == asset_data.asset_type_id,
-                    Asset.asset_subtype_name == asset_data.asset_subtype_name
-                )
-            ).first()
 
-            if existing_asset:
-                # Update existing asset
-                for key, value in asset_data.model_dump(exclude_unset=True).items():
-                    setattr(existing_asset, key, value)
-                session.add(existing_asset)
-                session.commit()
-                session.refresh(existing_asset)
-                created_or_updated_assets.append(existing_asset)
-                log_activity(request, session, current_user.id, ActivityType.ASSET_UPDATED, profile_id=existing_asset.profile_id)
-            else:
-                # Create new asset
-                db_asset = Asset.model_validate(asset_data)
-                session.add(db_asset)
-                session.commit()
-                session.refresh(db_asset)
-                created_or_updated_assets.append(db_asset)
-                log_activity(request, session, current_user.id, ActivityType.ASSET_RECORDED, profile_id=db_asset.profile_id)
-        except ValidationError as e:
-            logging.error(f"Pydantic ValidationError details: {e}")
-            error_details = e.errors()
-            formatted_errors = []
-            for err_item in error_details:
-                field = ".".join(err_item["loc"])
-                message = err_item["msg"]
-                formatted_errors.append(f"Validation error for {field}: {message}")
-            errors.append(f"Error processing asset for date {asset_data.date}: {'; '.join(formatted_errors)}")
-            session.rollback() # Rollback current transaction if an error occurs
-        except Exception as e:
-            errors.append(f"Error processing asset for date {asset_data.date}: {e}")
-            session.rollback() # Rollback current transaction if an error occurs
 
-    if errors:
-        raise HTTPException(status_code=400, detail=errors)
-    
-    return created_or_updated_assets
+def _refresh_asset_monthly_values(session: Session, profile_id: int, dates: Iterable[Optional[date]]) -> None:
+    """
+    Recomputes a profile's monthly asset series for the months spanned by `dates`, the
+    as_of_date values that were written or removed. Call after the asset changes are flushed.
+    """
+    months = [d.replace(day=1) for d in dates if d]
+    if not months:
+        return
+    first_month, last_month = min(months), max(months)
+    after_last_month = (last_month + timedelta(days=32)).replace(day=1)
+    session.execute(
+        delete(AssetMonthlyValue).where(
+            AssetMonthlyValue.profile_id == profile_id,
+            AssetMonthlyValue.year_month.between(first_month.strftime("%Y-%m"), last_month.strftime("%Y-%m")),
+        )
+    )
+    year_month = func.strftime("%Y-%m", Asset.as_of_date)
+    session.execute(
+        insert(AssetMonthlyValue).from_select(
+            ["profile_id", "year_month", "asset_type_name", "asset_subtype_name", "total_value", "snapshot_count"],
+            select(
+                Asset.profile_id, year_month, Asset.asset_type_name, Asset.asset_subtype_name,
+                func.sum(Asset.value), func.count(Asset.id),
+            )
+            .where(
+                Asset.profile_id == profile_id,
+                Asset.as_of_date >= first_month,
+                Asset.as_of_date < after_last_month,
+            )
+            .group_by(Asset.profile_id, year_month, Asset.asset_type_name, Asset.asset_subtype_name),
+        )
+    )
 
 
-@app.get("/api/profiles/{profile_id}/assets", response_model=List[AssetResponse])
-def get_assets_for_profile(
-    profile_id: int,
-    year: Optional[int] = None,
-    asset_type_id: Optional[int] = None,
-    session: Session = Depends(get_session),
-):
-    statement = select(Asset).where(Asset.profile_id == profile_id)
+def _backfill_asset_monthly_values(session: Session) -> int:
+    """
+    Builds the monthly asset series for every profile with assets. Returns the number of profiles.
+    """
+    spans = session.execute(
+        select(Asset.profile_id, func.min(Asset.as_of_date), func.max(Asset.as_of_date))
+        .where(Asset.as_of_date.is_not(None))
+        .group_by(Asset.profile_id)
+    ).all()
+    for profile_id, first_date, last_date in spans:
+        _refresh_asset_monthly_values(session, profile_id, [first_date, last_date])
+    return len(spans)
+
+
+@app.post("/api/assets", response_model=List[AssetResponse], response_class=FastJSONResponse)
+def create_assets_bulk(
+    asset_list: AssetCreateList, request: Request, session: Session = Depends(get_session), current_user: User = Depends(auth.get_current_active_user)
+):
+    """
+    Records a batch of asset snapshots. A snapshot that already exists for the same profile,
+    date, asset type and subtype is updated; otherwise it is created. Existing rows are
+    resolved with one query and the whole batch is written in a single transaction.
+    """
+    if not asset_list.assets:
+        return FastJSONResponse([])
+
+    profile_ids = {a.profile_id for a in asset_list.assets}
+    existing_assets = {
+        _asset_snapshot_key(a.profile_id, a.date, a.asset_type_id, a.asset_subtype_name): a
+        for a in session.exec(
+            select(Asset).where(
+                Asset.profile_id.in_(profile_ids),
+                Asset.date.in_({a.date for a in asset_list.assets}),
+            )
+        ).all()
+    }
+
+    keys = []
+    new_rows: Dict[tuple, Dict[str, Any]] = {}
+    for asset_data in asset_list.assets:
+        key = _asset_snapshot_key(asset_data.profile_id, asset_data.date, asset_data.asset_type_id, asset_data.asset_subtype_name)
+        keys.append(key)
+        if key in existing_assets:
+            for field, value in asset_data.model_dump(exclude_unset=True).items():
+                setattr(existing_assets[key], field, value)
+        elif key in new_rows:  # A repeated key later in the batch updates the pending row
+            new_rows[key].update(asset_data.model_dump(exclude_unset=True))
+        else:
+            new_rows[key] = {**asset_data.model_dump(), "as_of_date": parse_asset_date(asset_data.date)}
+
+    rows_by_key = {}
+    try:
+        for profile_id in profile_ids:
+            bump_profile_data_version(session, profile_id)  # Autoflushes the updates
+        if new_rows:
+            # The returned key columns are unique, so rows map back without tracking input order
+            inserted = session.execute(
+                insert(Asset).returning(*ASSET_RESPONSE_COLUMNS),
+                list(new_rows.values()),
+                execution_options={"render_nulls": True},
+            )
+            for row in inserted.mappings():
+                rows_by_key[_asset_snapshot_key(row["profile_id"], row["date"], row["asset_type_id"], row["asset_subtype_name"])] = dict(row)
+        for profile_id in profile_ids:
+            _refresh_asset_monthly_values(session, profile_id, [
+                existing_assets[key].as_of_date if key in existing_assets else new_rows[key]["as_of_date"]
+                for key in set(keys) if key[0] == profile_id
+            ])
+    except IntegrityError as e:
+        session.rollback()
+        logging.error(f"Asset bulk upsert failed: {e}")
+        raise HTTPException(status_code=409, detail="Asset snapshots changed concurrently; please retry.")
+    # Serialize before commit so the response does not reload every row
+    for key, db_asset in existing_assets.items():
+        if key in keys:
+            rows_by_key[key] = {column.key: getattr(db_asset, column.key) for column in ASSET_RESPONSE_COLUMNS}
+    session.commit()
+    result = [rows_by_key[key] for key in keys]
+    logging.info(f"Recorded assets: {len(new_rows)} created, {len(set(keys)) - len(new_rows)} updated.")
+
+    for profile_id in profile_ids:
+        log_activity(request, current_user.id, ActivityType.ASSET_BULK_RECORDED, profile_id=profile_id)
+    return FastJSONResponse(result)
+
+
+# Column list matching AssetResponse, used to read assets as plain rows
+ASSET_RESPONSE_COLUMNS = (
+    Asset.id,
+    Asset.profile_id,
+    Asset.date,
+    Asset.asset_type_id,
+    Asset.asset_type_name,
+    Asset.asset_subtype_name,
+    Asset.value,
+    Asset.note,
+)
+
+
+def _asset_filters(
+    profile_id: int,
+    year: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    asset_type_id: Optional[str] = None,
+    asset_subtype_name: Optional[str] = None,
+) -> list:
+    """
+    WHERE clauses for asset queries. Date filters are ranges on as_of_date, so they use the
+    (profile_id, as_of_date) index; month-only snapshots are dated the first of their month.
+    """
+    conditions = [Asset.profile_id == profile_id]
     if year:
-        statement = statement.where(Asset.date.like(f"%/{year}"))
+        conditions += [Asset.as_of_date >= date(year, 1, 1), Asset.as_of_date < date(year + 1, 1, 1)]
+    if start_date:
+        conditions.append(Asset.as_of_date >= start_date)
+    if end_date:
+        conditions.append(Asset.as_of_date <= end_date)
     if asset_type_id:
-        statement = statement.where(Asset.asset_type_id == asset_type_id)
-    
-    assets = session.exec(statement).all()
-    return assets
+        conditions.append(Asset.asset_type_id == asset_type_id)
+    if asset_subtype_name:
+        conditions.append(Asset.asset_subtype_name == asset_subtype_name)
+    return conditions
 
 
-@app.get("/api/profiles/{profile_id}/assets/summary")
-def get_assets_summary_for_profile(
+@app.get("/api/profiles/{profile_id}/assets", response_model=List[AssetResponse], response_class=FastJSONResponse)
+def get_assets_for_profile(
+    request: Request,
     profile_id: int,
     year: Optional[int] = None,
+    start_date: Optional[date] = Query(None, description="Only include snapshots on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only include snapshots on or before this date"),
+    asset_type_id: Optional[str] = None,
+    asset_subtype_name: Optional[str] = None,
     session: Session = Depends(get_session),
 ):
-    statement = select(Asset).where(Asset.profile_id == profile_id)
-    if year:
-        statement = statement.where(Asset.date.like(f"%/{year}"))
-    
+    profile = session.get(Profile, profile_id)
+    headers = {"ETag": _profile_etag(request, profile)} if profile else {}
+    not_modified = _not_modified_response(request, headers["ETag"]) if profile else None
+    if not_modified:
+        return not_modified
+
+    statement = select(*ASSET_RESPONSE_COLUMNS).where(
+        *_asset_filters(profile_id, year, start_date, end_date, asset_type_id, asset_subtype_name)
+    ).order_by(Asset.as_of_date, Asset.id)
+
+    # Plain rows already have the AssetResponse shape; skip per-object validation
     assets = session.exec(statement).all()
+    return FastJSONResponse([dict(row._mapping) for row in assets], headers=headers)
 
-    # Calculate total value per asset type
-    asset_type_summary = {}
-    for asset in assets:
-        if asset.asset_type_name not in asset_type_summary:
-            asset_type_summary[asset.asset_type_name] = 0
-        asset_type_summary[asset.asset_type_name] += asset.value
-    
-    # Calculate total portfolio value
-    total_portfolio_value = sum(asset.value for asset in assets)
 
-    return {
-        "total_portfolio_value": total_portfolio_value,
+def _summarize_assets(session: Session, conditions: list, include_assets: bool = True) -> Dict[str, Any]:
+    """
+    Totals asset values per asset type and across the whole portfolio in SQL.
+    The matching asset rows are included unless include_assets is False.
+    """
+    asset_type_summary = dict(session.execute(
+        select(Asset.asset_type_name, func.sum(Asset.value)).where(*conditions).group_by(Asset.asset_type_name)
+    ).all())
+    result = {
+        "total_portfolio_value": sum(asset_type_summary.values()),
         "asset_type_summary": asset_type_summary,
-        "assets": assets # Return all assets for detailed view if needed
     }
+    if include_assets:
+        result["assets"] = [
+            dict(row._mapping)
+            for row in session.execute(select(*ASSET_RESPONSE_COLUMNS).where(*conditions).order_by(Asset.as_of_date, Asset.id))
+        ]
+    return result
+
+
+def _summarize_total_latest_asset_value(session: Session, profile_id: int) -> Dict[str, float]:
+    """
+    Sums the most recent value recorded for each (asset_type_id, asset_subtype_name).
+    The latest snapshot per key is picked in SQL with a window over as_of_date
+    (ties go to the most recently added row), so no asset history is loaded.
+    """
+    ranked = (
+        select(
+            Asset.value,
+            func.row_number().over(
+                partition_by=(Asset.asset_type_id, Asset.asset_subtype_name),
+                order_by=(Asset.as_of_date.desc(), Asset.id.desc()),
+            ).label("recency"),
+        )
+        .where(Asset.profile_id == profile_id, Asset.as_of_date.is_not(None))
+        .subquery()
+    )
+    total_latest_asset_value, total_asset_value, total_debt_value = session.execute(
+        select(
+            func.coalesce(func.sum(ranked.c.value), 0),
+            func.coalesce(func.sum(case((ranked.c.value >= 0, ranked.c.value), else_=0)), 0),
+            func.coalesce(func.sum(case((ranked.c.value < 0, ranked.c.value), else_=0)), 0),
+        ).where(ranked.c.recency == 1)
+    ).one()
+    return {
+        "total_latest_asset_value": total_latest_asset_value,
+        "total_asset_value": total_asset_value,
+        "total_debt_value": total_debt_value,
+    }
+
+
+def _summarize_monthly_assets(
+    session: Session,
+    profile_id: int,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    fill_forward: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Totals asset values per (YYYY-MM, asset type, asset subtype), sorted by month, read from the
+    maintained monthly series. With fill_forward, every type/subtype seen so far is repeated in
+    months without a snapshot, carrying its last total, from start_month through end_month.
+    """
+    statement = select(
+        AssetMonthlyValue.year_month,
+        AssetMonthlyValue.asset_type_name,
+        AssetMonthlyValue.asset_subtype_name,
+        AssetMonthlyValue.total_value,
+    ).where(AssetMonthlyValue.profile_id == profile_id)
+    if start_month:
+        statement = statement.where(AssetMonthlyValue.year_month >= start_month)
+    if end_month:
+        statement = statement.where(AssetMonthlyValue.year_month <= end_month)
+    rows = session.execute(statement.order_by(
+        AssetMonthlyValue.year_month, AssetMonthlyValue.asset_type_name, AssetMonthlyValue.asset_subtype_name
+    )).all()
+    if not fill_forward:
+        return [
+            {"YearMonth": year_month, "AssetType": asset_type, "AssetSubtype": asset_subtype, "total_value": total_value}
+            for year_month, asset_type, asset_subtype, total_value in rows
+        ]
+
+    # Carry in the last total of each type/subtype recorded before the requested range
+    latest_values: Dict[tuple, float] = {}
+    if start_month:
+        ranked = (
+            select(
+                AssetMonthlyValue.asset_type_name,
+                AssetMonthlyValue.asset_subtype_name,
+                AssetMonthlyValue.total_value,
+                func.row_number().over(
+                    partition_by=(AssetMonthlyValue.asset_type_name, AssetMonthlyValue.asset_subtype_name),
+                    order_by=AssetMonthlyValue.year_month.desc(),
+                ).label("recency"),
+            )
+            .where(AssetMonthlyValue.profile_id == profile_id, AssetMonthlyValue.year_month < start_month)
+            .subquery()
+        )
+        for asset_type, asset_subtype, total_value in session.execute(
+            select(ranked.c.asset_type_name, ranked.c.asset_subtype_name, ranked.c.total_value).where(ranked.c.recency == 1)
+        ):
+            latest_values[(asset_type, asset_subtype)] = total_value
+
+    rows_by_month: Dict[str, List[tuple]] = {}
+    for year_month, asset_type, asset_subtype, total_value in rows:
+        rows_by_month.setdefault(year_month, []).append((asset_type, asset_subtype, total_value))
+    months = sorted(set(rows_by_month) | {m for m in (start_month, end_month) if m})
+    if not months:
+        return []
+
+    result = []
+    year, month = map(int, months[0].split("-"))
+    year_month = months[0]
+    while year_month <= months[-1]:
+        for asset_type, asset_subtype, total_value in rows_by_month.get(year_month, []):
+            latest_values[(asset_type, asset_subtype)] = total_value
+        for (asset_type, asset_subtype), total_value in sorted(latest_values.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+            result.append({"YearMonth": year_month, "AssetType": asset_type, "AssetSubtype": asset_subtype, "total_value": total_value})
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        year_month = f"{year:04d}-{month:02d}"
+    return result
+
+
+@app.get("/api/profiles/{profile_id}/assets/summary")
+def get_assets_summary_for_profile(
+    request: Request,
+    response: Response,
+    profile_id: int,
+    year: Optional[int] = None,
+    start_date: Optional[date] = Query(None, description="Only include snapshots on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only include snapshots on or before this date"),
+    include_assets: bool = Query(True, description="Include the matching asset rows; false returns only the totals"),
+    session: Session = Depends(get_session),
+):
+    not_modified = _check_profile_etag(request, response, session, profile_id)
+    if not_modified:
+        return not_modified
+    return _summarize_assets(session, _asset_filters(profile_id, year, start_date, end_date), include_assets)
 
 
 @app.get("/api/profiles/{profile_id}/assets/total_latest_value")
 def get_total_latest_asset_value(
+    request: Request,
+    response: Response,
     profile_id: int,
     session: Session = Depends(get_session),
 ):
-    assets = session.exec(
-        select(Asset).where(Asset.profile_id == profile_id)
-    ).all()
+    not_modified = _check_profile_etag(request, response, session, profile_id)
+    if not_modified:
+        return not_modified
+    return _summarize_total_latest_asset_value(session, profile_id)
 
-    latest_assets = {} # Key: (asset_type_id, asset_subtype_name), Value: latest Asset object
 
-    for asset in assets:
-        # Parse current asset's date
-        current_asset_parsed_date = None
-        try:
-            current_asset_parsed_date = datetime.strptime(asset.date, "%m/%Y")
-        except ValueError:
-            try:
-                current_asset_parsed_date = datetime.strptime(asset.date, "%m/%d/%Y")
-            except ValueError:
-                logging.error(f"Could not parse date '{asset.date}' for asset ID {asset.id}. Skipping.")
-                continue # Skip this asset if date parsing fails
-        
-        key = (asset.asset_type_id, asset.asset_subtype_name)
-        
-        if key not in latest_assets:
-            latest_assets[key] = asset
-        else:
-            # Parse the date of the asset currently considered latest for this key
-            existing_latest_asset = latest_assets[key]
-            existing_latest_parsed_date = None
-            try:
-                existing_latest_parsed_date = datetime.strptime(existing_latest_asset.date, "%m/%Y")
-            except ValueError:
-                try:
-                    existing_latest_parsed_date = datetime.strptime(existing_latest_asset.date, "%m/%d/%Y")
-                except ValueError:
-                    logging.error(f"Could not parse date '{existing_latest_asset.date}' for existing latest asset ID {existing_latest_asset.id}. Skipping comparison for this key.")
-                    continue # Skip comparison for this key if its date cannot be parsed
-
-            # Compare dates
-            if current_asset_parsed_date > existing_latest_parsed_date:
-                latest_assets[key] = asset
-            elif current_asset_parsed_date == existing_latest_parsed_date and asset.id > existing_latest_asset.id:
-                # If dates are the same, pick the one with the higher ID (more recently added)
-                latest_assets[key] = asset
-
-    total_latest_asset_value = sum(asset.value for asset in latest_assets.values())
-    total_asset_value = sum(asset.value for asset in latest_assets.values() if asset.value >= 0)
-    total_debt_value = sum(asset.value for asset in latest_assets.values() if asset.value < 0)
-    return {
-        "total_latest_asset_value": total_latest_asset_value,
-        "total_asset_value": total_asset_value,
-        "total_debt_value": total_debt_value,
-    }
+YEAR_MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
 
 
 @app.get("/api/profiles/{profile_id}/assets/monthly_summary")
 def get_monthly_asset_summary(
+    request: Request,
+    response: Response,
     profile_id: int,
+    start_month: Optional[str] = Query(None, pattern=YEAR_MONTH_PATTERN, description="First month (YYYY-MM) to include"),
+    end_month: Optional[str] = Query(None, pattern=YEAR_MONTH_PATTERN, description="Last month (YYYY-MM) to include"),
+    fill_forward: bool = Query(False, description="Repeat the last known total in months without a snapshot"),
     session: Session = Depends(get_session),
 ):
-    assets = session.exec(
-        select(Asset).where(Asset.profile_id == profile_id)
-    ).all()
-
-    monthly_summary = {} # Key: (YearMonth, AssetType, AssetSubtype), Value: total_value
-
-    for asset in assets:
-        # Extract YearMonth from "MM/yyyy" date format
-        month, year = asset.date.split('/')
-        year_month = f"{year}-{month}" # Format as YYYY-MM for consistent sorting
-
-        key = (year_month, asset.asset_type_name, asset.asset_subtype_name)
-        monthly_summary[key] = monthly_summary.get(key, 0) + asset.value
-    
-    result = [
-        {"YearMonth": k[0], "AssetType": k[1], "AssetSubtype": k[2], "total_value": v}
-        for k, v in monthly_summary.items()
-    ]
-    
-    # Sort by YearMonth
-    result.sort(key=lambda x: x["YearMonth"])
-    
-    return result
+    not_modified = _check_profile_etag(request, response, session, profile_id)
+    if not_modified:
+        return not_modified
+    return _summarize_monthly_assets(session, profile_id, start_month, end_month, fill_forward)
 
 
 @app.put("/api/assets/{asset_id}", response_model=AssetResponse)
@@ -1085,13 +1662,22 @@ def update_asset(
         raise HTTPException(status_code=404, detail="Asset not found")
 
     update_data = asset_update.model_dump(exclude_unset=True)
+    previous_as_of_date = db_asset.as_of_date
     for key, value in update_data.items():
         setattr(db_asset, key, value)
+    if "date" in update_data:
+        db_asset.as_of_date = parse_asset_date(db_asset.date)
 
     session.add(db_asset)
-    session.commit()
+    try:
+        bump_profile_data_version(session, db_asset.profile_id)  # Autoflushes the update
+        _refresh_asset_monthly_values(session, db_asset.profile_id, [previous_as_of_date, db_asset.as_of_date])
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="An asset for this date, type and subtype already exists.")
     session.refresh(db_asset)
-    log_activity(request, session, current_user.id, ActivityType.ASSET_UPDATED, profile_id=db_asset.profile_id)
+    log_activity(request, current_user.id, ActivityType.ASSET_UPDATED, profile_id=db_asset.profile_id)
     return db_asset
 
 
@@ -1103,45 +1689,29 @@ def delete_asset(
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     session.delete(asset)
+    bump_profile_data_version(session, asset.profile_id)
+    _refresh_asset_monthly_values(session, asset.profile_id, [asset.as_of_date])
     session.commit()
-    log_activity(request, session, current_user.id, ActivityType.ASSET_DELETED, profile_id=asset.profile_id)
+    log_activity(request, current_user.id, ActivityType.ASSET_DELETED, profile_id=asset.profile_id)
     return {"message": "Asset deleted successfully"}
 
 
-@app.get("/api/expenses")
-def get_expenses(
-    request: Request,
-    profile_id: int,
-    year: Optional[int] = None,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(auth.get_current_active_user),
-):
+def _load_profile_settings(session: Session, profile: Profile) -> Dict[str, Any]:
     """
-    Retrieves and categorizes all expenses for a given profile.
+    Builds the settings dictionary (categories, rules, budgets, currency) for a profile.
     """
-    excluded_categories = request.query_params.getlist("excluded_categories[]")
-    logging.info(
-        f"GET /api/expenses called with profile_id: {profile_id}, year: {year}, excluded_categories: {excluded_categories}"
-    )
-    profile = session.get(Profile, profile_id)
-    if not profile:
-        logging.error(f"Profile with ID {profile_id} not found.")
-        raise HTTPException(status_code=404, detail="Profile not found")
-    logging.info(f"Profile fetched: {profile.name}")
-
-    # Fetch settings for the profile
     categories_db = session.exec(
-        select(Category).where(Category.profile_id == profile_id)
+        select(Category).where(Category.profile_id == profile.id)
     ).all()
-    rules_db = session.exec(select(Rule).where(Rule.profile_id == profile_id)).all()
+    rules_db = session.exec(select(Rule).where(Rule.profile_id == profile.id)).all()
     budgets_db = session.exec(
-        select(Budget).where(Budget.profile_id == profile_id)
+        select(Budget).where(Budget.profile_id == profile.id)
     ).all()
     logging.info(
         f"Fetched {len(categories_db)} categories, {len(rules_db)} rules, {len(budgets_db)} budgets."
     )
 
-    settings = {
+    return {
         "categories": [
             {"name": c.name, "subcategories": json.loads(c.subcategories)}
             for c in categories_db
@@ -1155,105 +1725,612 @@ def get_expenses(
             }
             for r in rules_db
         ],
-        "budgets": [
-            {
-                "category": b.category,
-                "amount": b.amount,
-                "year": b.year,
-                "months": json.loads(b.months) if b.months else [],
-            }
-            for b in budgets_db
-        ],
+        "budgets": _budgets_from_rows(budgets_db),
         "currency": profile.currency,
     }
+
+
+def _transaction_to_dict(t: Transaction) -> Dict[str, Any]:
+    return {
+        "id": t.id,
+        "amount": t.amount,
+        "category": t.category,
+        "subcategory": t.subcategory,
+        "profile_id": t.profile_id,
+        "date": t.date,
+        "description": t.description,
+        "payment_source": t.payment_source,
+    }
+
+
+def _categorize_transactions(rule_engine: RuleEngine, transactions: List[Transaction]) -> int:
+    """
+    Applies the rule engine to each transaction and updates the ORM objects in place.
+    Returns the number of transactions whose category changed.
+    The caller is responsible for committing the session.
+    """
+    changed = 0
+    for t in transactions:
+        transaction_dict = _transaction_to_dict(t)
+        logging.debug(f"Processing transaction id={t.id}: {transaction_dict}")
+
+        category, subcategory = rule_engine.categorize_transaction(transaction_dict)
+        logging.debug(f"Categorized as: {category}:{subcategory}")
+
+        if (t.category, t.subcategory) != (category, subcategory):
+            t.category = category
+            t.subcategory = subcategory
+            changed += 1
+    return changed
+
+
+# Column list matching _transaction_to_dict, used to read and return transactions as plain rows
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.amount,
+    Transaction.category,
+    Transaction.subcategory,
+    Transaction.profile_id,
+    Transaction.date,
+    Transaction.description,
+    Transaction.payment_source,
+)
+
+
+def _categorize_transaction_rows(session: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Fills in category/subcategory for rows that arrive without a category, loading each
+    profile's rules once for the whole batch. Rows are plain dicts and are updated in place.
+    """
+    rule_engines: Dict[int, Optional[RuleEngine]] = {}
+    for row in rows:
+        if row.get("category"):
+            continue
+        profile_id = row["profile_id"]
+        if profile_id not in rule_engines:
+            profile = session.get(Profile, profile_id)
+            rule_engines[profile_id] = (
+                RuleEngine(settings_data=_load_profile_settings(session, profile)) if profile else None
+            )
+        rule_engine = rule_engines[profile_id]
+        if rule_engine:
+            row["category"], row["subcategory"] = rule_engine.categorize_transaction(row)
+
+
+
+def _insert_transaction_rows(
+    session: Session, rows: List[Dict[str, Any]], occurrences: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Categorizes and inserts imported transaction rows with batched multi-row
+    INSERT ... ON CONFLICT DO NOTHING RETURNING statements. Rows whose fingerprint already
+    exists are skipped, so re-importing overlapping data is idempotent. Pass the same
+    `occurrences` dict for every chunk of one import.
+    Returns the created rows, ids included, ordered by id.
+    The caller is responsible for bumping data versions and committing the session.
+    """
+    if not rows:
+        return []
+    if occurrences is None:
+        occurrences = {}
+    for row in rows:
+        row["fingerprint"] = transaction_fingerprint(row, occurrences)
+    _categorize_transaction_rows(session, rows)
+    # Each returned row carries all of its columns, so input order does not need to be tracked;
+    # asking SQLAlchemy for it would make SQLite fall back to one INSERT per row. render_nulls keeps
+    # rows with and without a subcategory in the same batch.
+    statement = (
+        sqlite_insert(Transaction)
+        .on_conflict_do_nothing(index_elements=["fingerprint"])
+        .returning(*TRANSACTION_COLUMNS)
+    )
+    result = session.execute(statement, rows, execution_options={"render_nulls": True})
+    return sorted((dict(row) for row in result.mappings()), key=lambda row: row["id"])
+
+
+def _transaction_sort_date():
+    """
+    SQL expression turning the stored MM/DD/YYYY date into a sortable YYYYMMDD string.
+    It mirrors the expression index ix_transaction_profile_sort_date created on startup.
+    """
+    return (
+        func.substr(Transaction.date, literal_column("7"), literal_column("4"))
+        .concat(func.substr(Transaction.date, literal_column("1"), literal_column("2")))
+        .concat(func.substr(Transaction.date, literal_column("4"), literal_column("2")))
+    )
+
+
+def _expense_filter_clauses(
+    request: Request,
+    profile_id: int,
+    year: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    min_amount: Optional[float],
+    max_amount: Optional[float],
+    include_category_filters: bool = True,
+) -> list:
+    """
+    Builds the SQL WHERE clauses shared by the transaction listing endpoints.
+    List filters are read from the query string in the same `name[]` form as `excluded_categories[]`.
+    """
+    clauses = [Transaction.profile_id == profile_id]
+    if year:
+        clauses.append(Transaction.date.like(f"%/{year}"))
+    if start_date:
+        clauses.append(_transaction_sort_date() >= start_date.strftime("%Y%m%d"))
+    if end_date:
+        clauses.append(_transaction_sort_date() <= end_date.strftime("%Y%m%d"))
+    if min_amount is not None:
+        clauses.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        clauses.append(Transaction.amount <= max_amount)
+
+    payment_sources = request.query_params.getlist("payment_sources[]")
+    if payment_sources:
+        clauses.append(Transaction.payment_source.in_(payment_sources))
+
+    if include_category_filters:
+        categories = request.query_params.getlist("categories[]")
+        if categories:
+            clauses.append(Transaction.category.in_(categories))
+        excluded_categories = request.query_params.getlist("excluded_categories[]")
+        if excluded_categories:
+            clauses.append(
+                or_(Transaction.category.is_(None), Transaction.category.not_in(excluded_categories))
+            )
+    return clauses
+
+
+def _encode_expense_cursor(t: Transaction) -> str:
+    sort_date = t.date[6:10] + t.date[0:2] + t.date[3:5]
+    return base64.urlsafe_b64encode(json.dumps([sort_date, t.id]).encode()).decode()
+
+
+def _decode_expense_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        sort_date, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(sort_date), int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/api/expenses", response_class=FastJSONResponse)
+def get_expenses(
+    request: Request,
+    profile_id: int,
+    year: Optional[int] = None,
+    start_date: Optional[datetime] = Query(None, description="Only include transactions on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only include transactions on or before this date"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor by the previous page"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Retrieves and categorizes all expenses for a given profile.
+
+    Without `limit` every matching transaction is returned split into income and expenses.
+    With `limit` the newest-first page is returned as `items` with a `next_cursor`;
+    only the rows of that page are re-categorized, and category filters apply to stored categories.
+    Use /api/expenses/totals for the aggregate figures.
+    """
+    excluded_categories = request.query_params.getlist("excluded_categories[]")
+    categories = request.query_params.getlist("categories[]")
+    logging.info(
+        f"GET /api/expenses called with profile_id: {profile_id}, year: {year}, excluded_categories: {excluded_categories}, limit: {limit}"
+    )
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        logging.error(f"Profile with ID {profile_id} not found.")
+        raise HTTPException(status_code=404, detail="Profile not found")
+    logging.info(f"Profile fetched: {profile.name}")
+
+    not_modified = _not_modified_response(request, _profile_etag(request, profile))
+    if not_modified:
+        return not_modified
+
+    settings = _load_profile_settings(session, profile)
     logging.debug(f"Constructed settings: {settings}")
 
     # Initialize RuleEngine with the profile's settings
     rule_engine = RuleEngine(settings_data=settings)
     logging.info("RuleEngine initialized.")
 
-    statement = select(Transaction).where(Transaction.profile_id == profile_id)
-    if year:
-        statement = statement.where(Transaction.date.like(f"%/{year}"))
+    if limit is not None:
+        clauses = _expense_filter_clauses(
+            request, profile_id, year, start_date, end_date, min_amount, max_amount
+        )
+        sort_date = _transaction_sort_date()
+        statement = select(Transaction).where(*clauses)
+        if cursor:
+            cursor_date, cursor_id = _decode_expense_cursor(cursor)
+            statement = statement.where(
+                or_(sort_date < cursor_date, and_(sort_date == cursor_date, Transaction.id < cursor_id))
+            )
+        statement = statement.order_by(sort_date.desc(), Transaction.id.desc()).limit(limit + 1)
+
+        rows = session.exec(statement).all()
+        page = rows[:limit]
+        if _categorize_transactions(rule_engine, page):
+            bump_profile_data_version(session, profile_id)
+        items = [_transaction_to_dict(t) for t in page]
+        next_cursor = _encode_expense_cursor(page[-1]) if len(rows) > limit else None
+        session.commit()
+        logging.info(f"Returning page of {len(items)} transactions, has_more: {next_cursor is not None}")
+
+        return FastJSONResponse({
+            "items": items,
+            "next_cursor": next_cursor,
+            "settings": settings,
+        }, headers={"ETag": _profile_etag(request, profile)})
+
+    # Category filters are applied after re-categorization so they see the current rules
+    clauses = _expense_filter_clauses(
+        request, profile_id, year, start_date, end_date, min_amount, max_amount,
+        include_category_filters=False,
+    )
+    statement = select(Transaction).where(*clauses)
 
     transactions = session.exec(statement).all()
     logging.info(f"Fetched {len(transactions)} transactions from DB.")
-    logging.info(transactions)
 
-    # Prepare a list to store JSON-ready transaction dicts
-    transactions_json_list = []
+    if _categorize_transactions(rule_engine, transactions):
+        bump_profile_data_version(session, profile_id)
+    # Serialize before committing; committed ORM objects expire and would be reloaded row by row
+    transactions = [_transaction_to_dict(t) for t in transactions]
 
-    # Process transactions
-    for t in transactions:
-        # Convert ORM object to dict
-        #transaction_dict = t.dict()
-        # Make a fresh dict manually instead of using t.dict()
-        transaction_dict = {
-            "id": t.id,
-            "amount": t.amount,
-            "category": t.category,
-            "subcategory": t.subcategory,
-            "profile_id": t.profile_id,
-            "date": t.date,
-            "description": t.description,
-            "payment_source": t.payment_source,
-        }
-        logging.debug(f"Processing transaction id={t.id}: {transaction_dict}")
+    # Commit changes to DB once after processing all transactions
+    session.commit()
+    logging.info(f"Updated {len(transactions)} transactions with categories in the DB.")
+
+    # Filter by category
+    if excluded_categories or categories:
+        transactions = [
+            t for t in transactions
+            if t["category"] not in excluded_categories and (not categories or t["category"] in categories)
+        ]
+        logging.info(f"Filtered transactions, remaining: {len(transactions)}")
+
+    income = [t for t in transactions if t["amount"] >= 0]
+    expenses = [t for t in transactions if t["amount"] < 0]
+    net_income = sum(t["amount"] for t in transactions)
+
+    logging.debug(
+        f"Returning income: {len(income)} items, expenses: {len(expenses)} items, net_income: {net_income}, settings: {settings}"
+    )
+
+    return FastJSONResponse({
+        "income": income,
+        "expenses": expenses,
+        "net_income": net_income,
+        "settings": settings,
+    }, headers={"ETag": _profile_etag(request, profile)})
+
+
+@app.get("/api/expenses/totals")
+def get_expense_totals(
+    request: Request,
+    response: Response,
+    profile_id: int,
+    year: Optional[int] = None,
+    start_date: Optional[datetime] = Query(None, description="Only include transactions on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only include transactions on or before this date"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Returns counts and sums for the transactions matching the /api/expenses filters, computed in SQL.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    not_modified = _check_profile_etag(request, response, session, profile_id)
+    if not_modified:
+        return not_modified
+
+    clauses = _expense_filter_clauses(
+        request, profile_id, year, start_date, end_date, min_amount, max_amount
+    )
+    is_income = Transaction.amount >= 0
+    statement = select(
+        func.count(Transaction.id),
+        func.count(case((is_income, 1))),
+        func.coalesce(func.sum(case((is_income, Transaction.amount), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((is_income, 0.0), else_=Transaction.amount)), 0.0),
+    ).where(*clauses)
+    count, income_count, total_income, total_expenses = session.exec(statement).one()
+
+    return {
+        "count": count,
+        "income_count": income_count,
+        "expense_count": count - income_count,
+        "total_income": total_income,
+        "total_expenses": total_expenses,
+        "net_income": total_income + total_expenses,
+    }
+
+
+class ExpenseStreamFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+EXPENSE_STREAM_BATCH_SIZE = 500
+
+
+def _stream_expenses(
+    settings: Dict[str, Any],
+    clauses: list,
+    categories: List[str],
+    excluded_categories: List[str],
+    stream_format: ExpenseStreamFormat,
+):
+    """
+    Yields categorized transactions batch by batch from a server-side cursor.
+    Rows are read as plain tuples and categorized in flight without writing back,
+    so memory stays bounded by the batch size.
+    """
+    rule_engine = RuleEngine(settings_data=settings)
+    statement = (
+        select(*TRANSACTION_COLUMNS)
+        .where(*clauses)
+        .order_by(_transaction_sort_date().desc(), Transaction.id.desc())
+        .execution_options(yield_per=EXPENSE_STREAM_BATCH_SIZE)
+    )
+    separator = "\n" if stream_format == ExpenseStreamFormat.NDJSON else ","
+    first_batch = True
+
+    if stream_format == ExpenseStreamFormat.JSON:
+        yield "["
+    # The request-scoped session may already be closed while the body streams
+    with Session(engine) as stream_session:
+        for partition in stream_session.exec(statement).partitions():
+            lines = []
+            for row in partition:
+                transaction = dict(row._mapping)
+                transaction["category"], transaction["subcategory"] = rule_engine.categorize_transaction(transaction)
+                if transaction["category"] in excluded_categories:
+                    continue
+                if categories and transaction["category"] not in categories:
+                    continue
+                lines.append(json.dumps(transaction, separators=(",", ":")))
+            if not lines:
+                continue
+            chunk = separator.join(lines)
+            if stream_format == ExpenseStreamFormat.NDJSON:
+                chunk += "\n"
+            elif not first_batch:
+                chunk = "," + chunk
+            first_batch = False
+            yield chunk
+    if stream_format == ExpenseStreamFormat.JSON:
+        yield "]"
+
+
+@app.get("/api/expenses/stream")
+def stream_expenses(
+    request: Request,
+    profile_id: int,
+    format: ExpenseStreamFormat = ExpenseStreamFormat.NDJSON,
+    year: Optional[int] = None,
+    start_date: Optional[datetime] = Query(None, description="Only include transactions on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only include transactions on or before this date"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Streams the profile's transactions newest first, as NDJSON (one object per line)
+    or as a single chunked JSON array. Accepts the same filters as /api/expenses.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    settings = _load_profile_settings(session, profile)
+    # Category filters run after in-flight categorization, as in /api/expenses
+    clauses = _expense_filter_clauses(
+        request, profile_id, year, start_date, end_date, min_amount, max_amount,
+        include_category_filters=False,
+    )
+    media_type = "application/x-ndjson" if format == ExpenseStreamFormat.NDJSON else "application/json"
+    return StreamingResponse(
+        _stream_expenses(
+            settings,
+            clauses,
+            request.query_params.getlist("categories[]"),
+            request.query_params.getlist("excluded_categories[]"),
+            format,
+        ),
+        media_type=media_type,
+    )
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    PARQUET = "parquet"
+
+
+EXPORT_BATCH_SIZE = 5000
+
+# Column names and Parquet types of exported transactions and assets; dates are typed in Parquet
+TRANSACTION_EXPORT_COLUMNS = ["id", "date", "description", "amount", "payment_source", "category", "subcategory"]
+ASSET_EXPORT_COLUMNS = ["id", "date", "asset_type_name", "asset_subtype_name", "value", "note"]
+
+
+def _transaction_export_schema():
+    pa = export.pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("description", pa.string()),
+        ("amount", pa.float64()),
+        ("payment_source", pa.string()),
+        ("category", pa.string()),
+        ("subcategory", pa.string()),
+    ])
+
+
+def _asset_export_schema():
+    pa = export.pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.string()),  # MM/YYYY or MM/DD/YYYY, kept as entered
+        ("asset_type_name", pa.string()),
+        ("asset_subtype_name", pa.string()),
+        ("value", pa.float64()),
+        ("note", pa.string()),
+    ])
+
+
+def _export_batches(statement):
+    """
+    Yields rows of `statement` in lists of EXPORT_BATCH_SIZE from a server-side cursor.
+    """
+    # The request-scoped session may already be closed while the body streams
+    with Session(engine) as export_session:
+        for partition in export_session.exec(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        ).partitions():
+            yield [tuple(row) for row in partition]
+
+
+def _export_response(
+    statement, columns: List[str], export_format: ExportFormat, filename: str, parquet_schema=None, date_columns=None
+) -> StreamingResponse:
+    if export_format == ExportFormat.PARQUET:
+        body = export.iter_parquet(parquet_schema(), _export_batches(statement), date_columns)
+        media_type = "application/vnd.apache.parquet"
+    else:
+        body = export.iter_csv(columns, _export_batches(statement))
+        media_type = "text/csv"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
+
+
+def _check_export_format(export_format: ExportFormat) -> None:
+    if export_format == ExportFormat.PARQUET and not export.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow to be installed on the server")
+
+
+@app.get("/api/profiles/{profile_id}/transactions/export")
+def export_transactions(
+    request: Request,
+    profile_id: int,
+    format: ExportFormat = ExportFormat.CSV,
+    year: Optional[int] = None,
+    start_date: Optional[datetime] = Query(None, description="Only include transactions on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only include transactions on or before this date"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Streams the profile's transactions, oldest first, as CSV or Parquet.
+    Rows are read from a server-side cursor and written batch by batch, so memory use does not
+    grow with the size of the export. Categories are exported as stored.
+    Accepts the same filters as /api/expenses except the amount range.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    _check_export_format(format)
+
+    clauses = _expense_filter_clauses(request, profile_id, year, start_date, end_date, None, None)
+    statement = (
+        select(*(getattr(Transaction, column) for column in TRANSACTION_EXPORT_COLUMNS))
+        .where(*clauses)
+        .order_by(_transaction_sort_date(), Transaction.id)
+    )
+    log_activity(request, current_user.id, ActivityType.TRANSACTION_VIEWED, profile_id=profile_id)
+    return _export_response(
+        statement, TRANSACTION_EXPORT_COLUMNS, format, f"transactions_{profile.public_id}",
+        parquet_schema=_transaction_export_schema, date_columns={"date": "%m/%d/%Y"},
+    )
+
+
+@app.get("/api/profiles/{profile_id}/assets/export")
+def export_assets(
+    request: Request,
+    profile_id: int,
+    format: ExportFormat = ExportFormat.CSV,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Streams the profile's asset records as CSV or Parquet, batch by batch from a server-side cursor.
+    """
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    _check_export_format(format)
 
-        # Categorize
-        category, subcategory = rule_engine.categorize_transaction(transaction_dict)
-        logging.debug(f"Categorized as: {category}:{subcategory}")
+    statement = (
+        select(*(getattr(Asset, column) for column in ASSET_EXPORT_COLUMNS))
+        .where(Asset.profile_id == profile_id)
+        .order_by(Asset.id)
+    )
+    log_activity(request, current_user.id, ActivityType.ASSET_VIEWED, profile_id=profile_id)
+    return _export_response(
+        statement, ASSET_EXPORT_COLUMNS, format, f"assets_{profile.public_id}",
+        parquet_schema=_asset_export_schema,
+    )
 
-        # Update ORM object
-        t.category = category
-        t.subcategory = subcategory
-
-        # Add to JSON list
-        transactions_json_list.append({
-            "id": t.id,
-            "amount": t.amount,
-            "category": t.category,
-            "subcategory": t.subcategory,
-            "profile_id": t.profile_id,
-            "date": t.date,
-            "description": t.description,
-            "payment_source": t.payment_source
-        })
-
-    # Optionally: Inspect JSON before committing
-    transactions_json_str = json.dumps(transactions_json_list, indent=2)
-    logging.info(f"Categorized transactions JSON:\n{transactions_json_str}")
 
-    # Commit changes to DB once after processing all transactions
-    session.commit()
-    logging.info(f"Updated {len(transactions)} transactions with categories in the DB.")
+def _summarize_category_costs(
+    transactions: List[Transaction], excluded_categories: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Sums absolute expense amounts per (category, subcategory).
+    """
+    category_costs = {}
+    for t in transactions:
+        if t.amount >= 0 or t.category in excluded_categories:
+            continue
+        key = (t.category, t.subcategory)
+        category_costs[key] = category_costs.get(key, 0) + abs(t.amount)
 
-    # Filter out excluded categories
-    if excluded_categories:
-        transactions = [
-            t for t in transactions if t.category not in excluded_categories
-        ]
-        logging.info(f"Filtered transactions, remaining: {len(transactions)}")
+    return [
+        {"Category": k[0], "Subcategory": k[1], "total_cost": v}
+        for k, v in category_costs.items()
+    ]
 
-    income = [t for t in transactions if t.amount >= 0]
-    expenses = [t for t in transactions if t.amount < 0]
-    net_income = sum(t.amount for t in transactions)
 
-    logging.debug(
-        f"Returning income: {len(income)} items, expenses: {len(expenses)} items, net_income: {net_income}, settings: {settings}"
-    )
+def _summarize_monthly_category_expenses(
+    transactions: List[Transaction], excluded_categories: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Sums absolute expense amounts per (YYYY-MM, category, subcategory).
+    """
+    monthly_category_expenses = {}
+    for t in transactions:
+        if t.amount >= 0 or t.category in excluded_categories:
+            continue
+        year_month = t.date[-4:] + "-" + t.date[:2]  # Extract YYYY-MM from MM/DD/YYYY
+        key = (year_month, t.category, t.subcategory)
+        monthly_category_expenses[key] = monthly_category_expenses.get(key, 0) + abs(
+            t.amount
+        )
+    logging.debug(f"Aggregated monthly_category_expenses: {monthly_category_expenses}")
 
-    return {
-        "income": income,
-        "expenses": expenses,
-        "net_income": net_income,
-        "settings": settings,
-    }
+    return [
+        {"YearMonth": k[0], "Category": k[1], "Subcategory": k[2], "total_cost": v}
+        for k, v in monthly_category_expenses.items()
+    ]
 
 
 @app.get("/api/category_costs")
 async def get_category_costs(
     request: Request,
+    response: Response,
     profile_id: int,
     year: Optional[int] = None,
     session: Session = Depends(get_session),
@@ -1261,6 +2338,13 @@ async def get_category_costs(
     """
     Calculates the total cost for each category for a given profile.
     """
+    not_modified = _check_profile_etag(request, response, session, profile_id)
+    if not_modified:
+        return not_modified
+    cache_key = _response_cache_key(request, session, profile_id)
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return cached
     excluded_categories = request.query_params.getlist("excluded_categories[]")
     statement = select(Transaction).where(
         Transaction.profile_id == profile_id, Transaction.amount < 0
@@ -1269,26 +2353,16 @@ async def get_category_costs(
         statement = statement.where(Transaction.date.like(f"%/{year}"))
 
     transactions = session.exec(statement).all()
-
-    if excluded_categories:
-        transactions = [
-            t for t in transactions if t.category not in excluded_categories
-        ]
-
-    category_costs = {}
-    for t in transactions:
-        key = (t.category, t.subcategory)
-        category_costs[key] = category_costs.get(key, 0) + abs(t.amount)
-
-    return [
-        {"Category": k[0], "Subcategory": k[1], "total_cost": v}
-        for k, v in category_costs.items()
-    ]
+    result = _summarize_category_costs(transactions, excluded_categories)
+    if cache_key:
+        response_cache.set(cache_key, result, profile_id=profile_id)
+    return result
 
 
 @app.get("/api/monthly_category_expenses")
 async def get_monthly_category_expenses(
     request: Request,
+    response: Response,
     profile_id: int,
     year: Optional[int] = None,
     session: Session = Depends(get_session),
@@ -1299,6 +2373,14 @@ async def get_monthly_category_expenses(
     logging.info(
         f"GET /api/monthly_category_expenses called with profile_id: {profile_id}, year: {year}"
     )
+    not_modified = _check_profile_etag(request, response, session, profile_id)
+    if not_modified:
+        return not_modified
+    cache_key = _response_cache_key(request, session, profile_id)
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        logging.info(f"Returning {len(cached)} cached items for monthly category expenses.")
+        return cached
     excluded_categories = request.query_params.getlist("excluded_categories[]")
     statement = select(Transaction).where(
         Transaction.profile_id == profile_id, Transaction.amount < 0
@@ -1311,24 +2393,9 @@ async def get_monthly_category_expenses(
         f"Fetched {len(transactions)} transactions for monthly category expenses."
     )
 
-    if excluded_categories:
-        transactions = [
-            t for t in transactions if t.category not in excluded_categories
-        ]
-
-    monthly_category_expenses = {}
-    for t in transactions:
-        year_month = t.date[-4:] + "-" + t.date[:2]  # Extract YYYY-MM from MM/DD/YYYY
-        key = (year_month, t.category, t.subcategory)
-        monthly_category_expenses[key] = monthly_category_expenses.get(key, 0) + abs(
-            t.amount
-        )
-    logging.debug(f"Aggregated monthly_category_expenses: {monthly_category_expenses}")
-
-    result = [
-        {"YearMonth": k[0], "Category": k[1], "Subcategory": k[2], "total_cost": v}
-        for k, v in monthly_category_expenses.items()
-    ]
+    result = _summarize_monthly_category_expenses(transactions, excluded_categories)
+    if cache_key:
+        response_cache.set(cache_key, result, profile_id=profile_id)
     logging.info(f"Returning {len(result)} items for monthly category expenses.")
     return result
 
@@ -1389,8 +2456,9 @@ def update_settings(
         )
         session.add(db_budget)
 
+    bump_profile_data_version(session, profile_id)
     session.commit()
-    log_activity(request, session, current_user.id, ActivityType.SETTINGS_UPDATED, profile_id=profile_id)
+    log_activity(request, current_user.id, ActivityType.SETTINGS_UPDATED, profile_id=profile_id)
     return {"message": "Settings updated successfully"}
 
 
@@ -1590,54 +2658,35 @@ def get_budget_for_period(
     return 0.0
 
 
-@app.get("/api/budget_vs_expenses")
-async def get_budget_vs_expenses(
-    request: Request,
-    profile_id: int,
-    time_granularity: BudgetTimeWindow = BudgetTimeWindow.MONTHLY,
-    num_periods: int = 12,
-    year: Optional[int] = None,
-    session: Session = Depends(get_session),
-):
-    """
-    Provides data for the budget vs. expense graph for a given profile.
-    """
-    categories = request.query_params.getlist("categories[]")
-    logging.info(f"GET /api/budget_vs_expenses called with profile_id: {profile_id}, time_granularity: {time_granularity}, num_periods: {num_periods}, year: {year}, categories: {categories}")
-    profile = session.get(Profile, profile_id)
-    if not profile:
-        logging.error(f"Profile with ID {profile_id} not found for budget_vs_expenses.")
-        raise HTTPException(status_code=404, detail="Profile not found")
-    logging.info(f"Profile '{profile.name}' fetched for budget_vs_expenses.")
-
-    # Fetch settings for the profile to get budgets
-    budgets_db = session.exec(
-        select(Budget).where(Budget.profile_id == profile_id)
-    ).all()
-    budgets = [
-        BudgetModel(
-            category=b.category,
-            amount=b.amount,
-            year=b.year,
-            months=json.loads(b.months) if b.months else [],
-        )
+def _budgets_from_rows(budgets_db: List[Budget]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "category": b.category,
+            "amount": b.amount,
+            "year": b.year,
+            "months": json.loads(b.months) if b.months else [],
+        }
         for b in budgets_db
     ]
-    logging.info(f"Fetched {len(budgets)} budgets for profile {profile_id}.")
 
-    # Fetch transactions for the profile
-    statement = select(Transaction).where(
-        Transaction.profile_id == profile_id, Transaction.amount < 0
-    )
-    if year:
-        statement = statement.where(Transaction.date.like(f"%/{year}"))
-    if categories:  # Add condition to filter by categories
-        statement = statement.where(Transaction.category.in_(categories))
-    transactions = session.exec(statement).all()
-    logging.info(f"Fetched {len(transactions)} transactions for budget_vs_expenses.")
 
+def _summarize_budget_vs_expenses(
+    transactions: List[Transaction],
+    budgets: List[BudgetModel],
+    time_granularity: BudgetTimeWindow,
+    num_periods: int,
+    year: Optional[int],
+    categories: List[str],
+) -> List[Dict[str, Any]]:
+    """
+    Compares budgeted amounts with actual expenses for each period and category.
+    """
     # Convert transactions to a DataFrame for easier processing
-    transactions_data = [t.dict() for t in transactions]
+    transactions_data = [
+        {"date": t.date, "amount": t.amount, "category": t.category}
+        for t in transactions
+        if t.amount < 0 and (not categories or t.category in categories)
+    ]
     expenses_df = pd.DataFrame(transactions_data)
     logging.info(f"Created DataFrame with {len(expenses_df)} expenses.")
 
@@ -1731,6 +2780,162 @@ async def get_budget_vs_expenses(
     return results_df.reset_index().to_dict(orient="records")
 
 
+@app.get("/api/budget_vs_expenses")
+async def get_budget_vs_expenses(
+    request: Request,
+    response: Response,
+    profile_id: int,
+    time_granularity: BudgetTimeWindow = BudgetTimeWindow.MONTHLY,
+    num_periods: int = 12,
+    year: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Provides data for the budget vs. expense graph for a given profile.
+    """
+    categories = request.query_params.getlist("categories[]")
+    logging.info(f"GET /api/budget_vs_expenses called with profile_id: {profile_id}, time_granularity: {time_granularity}, num_periods: {num_periods}, year: {year}, categories: {categories}")
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        logging.error(f"Profile with ID {profile_id} not found for budget_vs_expenses.")
+        raise HTTPException(status_code=404, detail="Profile not found")
+    logging.info(f"Profile '{profile.name}' fetched for budget_vs_expenses.")
+
+    # The reporting periods are anchored on today's date
+    today = datetime.now().date()
+    not_modified = _check_profile_etag(request, response, session, profile_id, today)
+    if not_modified:
+        return not_modified
+    cache_key = _response_cache_key(request, session, profile_id, today)
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return cached
+
+    # Fetch settings for the profile to get budgets
+    budgets_db = session.exec(
+        select(Budget).where(Budget.profile_id == profile_id)
+    ).all()
+    budgets = [BudgetModel(**b) for b in _budgets_from_rows(budgets_db)]
+    logging.info(f"Fetched {len(budgets)} budgets for profile {profile_id}.")
+
+    # Fetch transactions for the profile
+    statement = select(Transaction).where(
+        Transaction.profile_id == profile_id, Transaction.amount < 0
+    )
+    if year:
+        statement = statement.where(Transaction.date.like(f"%/{year}"))
+    if categories:  # Add condition to filter by categories
+        statement = statement.where(Transaction.category.in_(categories))
+    transactions = session.exec(statement).all()
+    logging.info(f"Fetched {len(transactions)} transactions for budget_vs_expenses.")
+
+    result = _summarize_budget_vs_expenses(
+        transactions, budgets, time_granularity, num_periods, year, categories
+    )
+    if cache_key:
+        response_cache.set(cache_key, result, profile_id=profile_id)
+    return result
+
+
+class DashboardPanel(str, Enum):
+    EXPENSES = "expenses"
+    CATEGORY_COSTS = "category_costs"
+    MONTHLY_CATEGORY_EXPENSES = "monthly_category_expenses"
+    BUDGET_VS_EXPENSES = "budget_vs_expenses"
+    ASSETS_SUMMARY = "assets_summary"
+    ASSETS_TOTAL_LATEST_VALUE = "assets_total_latest_value"
+    ASSETS_MONTHLY_SUMMARY = "assets_monthly_summary"
+
+
+EXPENSE_DASHBOARD_PANELS = {
+    DashboardPanel.EXPENSES,
+    DashboardPanel.CATEGORY_COSTS,
+    DashboardPanel.MONTHLY_CATEGORY_EXPENSES,
+    DashboardPanel.BUDGET_VS_EXPENSES,
+}
+
+
+@app.get("/api/profiles/{profile_id}/dashboard", response_class=FastJSONResponse)
+def get_profile_dashboard(
+    request: Request,
+    profile_id: int,
+    panels: Optional[List[DashboardPanel]] = Query(None, description="Panels to compute; all panels when omitted"),
+    year: Optional[int] = None,
+    time_granularity: BudgetTimeWindow = BudgetTimeWindow.MONTHLY,
+    num_periods: int = 12,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Computes the requested dashboard panels for a profile in a single round trip.
+    Transactions, settings and assets are each loaded at most once and shared by all panels.
+    Each panel returns the same payload as its standalone endpoint.
+    """
+    excluded_categories = request.query_params.getlist("excluded_categories[]")
+    categories = request.query_params.getlist("categories[]")
+    requested_panels = set(panels) if panels else set(DashboardPanel)
+    logging.info(
+        f"GET /api/profiles/{profile_id}/dashboard called with panels: {sorted(p.value for p in requested_panels)}, year: {year}"
+    )
+
+    profile = session.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    not_modified = _not_modified_response(request, _profile_etag(request, profile, datetime.now().date()))
+    if not_modified:
+        return not_modified
+
+    result = {}
+
+    if requested_panels & EXPENSE_DASHBOARD_PANELS:
+        settings = _load_profile_settings(session, profile)
+
+        statement = select(Transaction).where(Transaction.profile_id == profile_id)
+        if year:
+            statement = statement.where(Transaction.date.like(f"%/{year}"))
+        transactions = session.exec(statement).all()
+        logging.info(f"Fetched {len(transactions)} transactions for dashboard.")
+
+        if DashboardPanel.EXPENSES in requested_panels:
+            # Keep stored categories in sync, as /api/expenses does
+            if _categorize_transactions(RuleEngine(settings_data=settings), transactions):
+                bump_profile_data_version(session, profile_id)
+            visible = [t for t in transactions if t.category not in excluded_categories]
+            result[DashboardPanel.EXPENSES.value] = {
+                "income": [_transaction_to_dict(t) for t in visible if t.amount >= 0],
+                "expenses": [_transaction_to_dict(t) for t in visible if t.amount < 0],
+                "net_income": sum(t.amount for t in visible),
+                "settings": settings,
+            }
+        if DashboardPanel.CATEGORY_COSTS in requested_panels:
+            result[DashboardPanel.CATEGORY_COSTS.value] = _summarize_category_costs(
+                transactions, excluded_categories
+            )
+        if DashboardPanel.MONTHLY_CATEGORY_EXPENSES in requested_panels:
+            result[DashboardPanel.MONTHLY_CATEGORY_EXPENSES.value] = _summarize_monthly_category_expenses(
+                transactions, excluded_categories
+            )
+        if DashboardPanel.BUDGET_VS_EXPENSES in requested_panels:
+            budgets = [BudgetModel(**b) for b in settings["budgets"]]
+            result[DashboardPanel.BUDGET_VS_EXPENSES.value] = _summarize_budget_vs_expenses(
+                transactions, budgets, time_granularity, num_periods, year, categories
+            )
+
+        # Persist categorization changes once all transaction panels have been computed
+        session.commit()
+
+    if requested_panels - EXPENSE_DASHBOARD_PANELS:
+        if DashboardPanel.ASSETS_SUMMARY in requested_panels:
+            result[DashboardPanel.ASSETS_SUMMARY.value] = _summarize_assets(session, _asset_filters(profile_id, year))
+        if DashboardPanel.ASSETS_TOTAL_LATEST_VALUE in requested_panels:
+            result[DashboardPanel.ASSETS_TOTAL_LATEST_VALUE.value] = _summarize_total_latest_asset_value(session, profile_id)
+        if DashboardPanel.ASSETS_MONTHLY_SUMMARY in requested_panels:
+            result[DashboardPanel.ASSETS_MONTHLY_SUMMARY.value] = _summarize_monthly_assets(session, profile_id)
+
+    return FastJSONResponse(result, headers={"ETag": _profile_etag(request, profile, datetime.now().date())})
+
+
 # --- Admin Endpoints ---
 
 class RoleUpdate(BaseModel):
@@ -1751,7 +2956,7 @@ def log_generic_activity(
 ):
     # Log the received payload for debugging
     logging.info(f"Received log_activity request payload: {jsonable_encoder(log_request)}")
-    log_activity(request, session, current_user.id, log_request.activity_type, profile_id=log_request.profile_id)
+    log_activity(request, current_user.id, log_request.activity_type, profile_id=log_request.profile_id)
     return {"message": f"Activity '{log_request.activity_type}' logged successfully"}
 
 
@@ -1770,8 +2975,9 @@ def assign_role(
     target_user.role = role_update.role
     session.add(target_user)
     session.commit()
+    auth.invalidate_cached_user(target_user.id)
     session.refresh(target_user)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_ROLE_ASSIGNED)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_ROLE_ASSIGNED)
 
     is_premium = False
     if target_user.subscription_expiry_date:
@@ -1807,6 +3013,12 @@ def get_all_users(
         ) for user in users
     ]
 
+@app.get("/api/admin/auth/password_hashing")
+def get_password_hashing_stats(
+    admin_user: User = Depends(auth.get_current_admin_user),
+):
+    return auth.password_hasher.stats()
+
 @app.get("/api/admin/users/count")
 def get_users_count(
     session: Session = Depends(get_session),
@@ -1844,55 +3056,24 @@ def get_user_signups_by_day(
 ):
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
-    
-    signups = session.exec(
-        select(UserActivity).where(
-            UserActivity.activity_type == ActivityType.USER_SIGNED_UP,
-            UserActivity.timestamp >= start_date,
-            UserActivity.timestamp <= end_date
-        )
-    ).all()
-    
-    signups_by_day = {}
-    for i in range(days):
-        date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-        signups_by_day[date] = 0
-        
-    for signup in signups:
-        date_str = signup.timestamp.strftime("%Y-%m-%d")
-        if date_str in signups_by_day:
-            signups_by_day[date_str] += 1
-            
-    return [{"date": date, "count": count} for date, count in signups_by_day.items()]
 
-
-@app.get("/api/admin/user-signups-by-day")
-def get_user_signups_by_day(
-    days: int = 7,
-    session: Session = Depends(get_session),
-    admin_user: User = Depends(auth.get_current_admin_user),
-):
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    signups = session.exec(
-        select(UserActivity).where(
-            UserActivity.activity_type == ActivityType.USER_SIGNED_UP,
-            UserActivity.timestamp >= start_date,
-            UserActivity.timestamp <= end_date
+    # Read from the hourly counters, so the window is applied at hour resolution
+    day = func.substr(ActivityHourlyCount.hour, 1, 10)
+    counts = dict(session.exec(
+        select(day, func.sum(ActivityHourlyCount.event_count))
+        .where(
+            ActivityHourlyCount.activity_type == ActivityType.USER_SIGNED_UP,
+            ActivityHourlyCount.hour >= start_date.strftime(ROLLUP_HOUR_FORMAT),
+            ActivityHourlyCount.hour <= end_date.strftime(ROLLUP_HOUR_FORMAT),
         )
-    ).all()
-    
+        .group_by(day)
+    ).all())
+
     signups_by_day = {}
     for i in range(days):
         date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-        signups_by_day[date] = 0
-        
-    for signup in signups:
-        date_str = signup.timestamp.strftime("%Y-%m-%d")
-        if date_str in signups_by_day:
-            signups_by_day[date_str] += 1
-            
+        signups_by_day[date] = counts.get(date, 0)
+
     return [{"date": date, "count": count} for date, count in signups_by_day.items()]
 
 @app.get("/api/admin/new-subscriptions-by-day")
@@ -1904,15 +3085,20 @@ def get_new_subscriptions_by_day(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
 
-    new_subscriptions = session.exec(
-        select(SubscriptionHistory).where(
+    # Counted per day and type in SQL; purchase_date is stored as "YYYY-MM-DD HH:MM:SS..."
+    day = func.substr(SubscriptionHistory.purchase_date, 1, 10)
+    counts = session.exec(
+        select(day, SubscriptionHistory.subscription_type, func.count())
+        .where(
             SubscriptionHistory.purchase_date >= start_date,
             SubscriptionHistory.purchase_date <= end_date
         )
+        .group_by(day, SubscriptionHistory.subscription_type)
+        .order_by(SubscriptionHistory.subscription_type)
     ).all()
 
     # Get all unique subscription types
-    all_subscription_types = list(set([sub.subscription_type for sub in new_subscriptions]))
+    all_subscription_types = list(dict.fromkeys(subscription_type for _, subscription_type, _ in counts))
     if not all_subscription_types:
         all_subscription_types = ["monthly", "yearly", "trial"] # Default types if no subscriptions exist
 
@@ -1920,12 +3106,11 @@ def get_new_subscriptions_by_day(
     for i in range(days):
         date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
         subscriptions_by_day_and_type[date] = {st: 0 for st in all_subscription_types}
-        
-    for sub in new_subscriptions:
-        date_str = sub.purchase_date.strftime("%Y-%m-%d")
-        if date_str in subscriptions_by_day_and_type and sub.subscription_type in subscriptions_by_day_and_type[date_str]:
-            subscriptions_by_day_and_type[date_str][sub.subscription_type] += 1
-            
+
+    for date_str, subscription_type, count in counts:
+        if date_str in subscriptions_by_day_and_type:
+            subscriptions_by_day_and_type[date_str][subscription_type] = count
+
     result = []
     for date, types_count in subscriptions_by_day_and_type.items():
         entry = {"date": date}
@@ -2032,6 +3217,43 @@ def get_total_revenue_by_day(
     return [{"date": date, "total_amount": amount} for date, amount in revenue_by_day.items()]
 
 
+@app.get("/api/admin/activity/writer")
+def get_activity_writer_stats(
+    admin_user: User = Depends(auth.get_current_admin_user),
+):
+    return activity_writer.stats()
+
+
+@app.post("/api/admin/activity/archive")
+def archive_old_activity(
+    admin_user: User = Depends(auth.get_current_admin_user),
+):
+    return activity_archiver.run()
+
+
+@app.get("/api/admin/activity/archive")
+def get_archived_activity(
+    admin_user: User = Depends(auth.get_current_admin_user),
+    start_date: Optional[datetime] = Query(None, description="Start of the period to search"),
+    end_date: Optional[datetime] = Query(None, description="End of the period to search"),
+    user_id: Optional[int] = Query(None, description="Filter events by user ID"),
+    profile_id: Optional[int] = Query(None, description="Filter events by profile ID"),
+    activity_type: Optional[ActivityType] = Query(None, description="Filter events by activity type"),
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    """
+    Searches activity events that were moved out of the useractivity table, oldest first.
+    """
+    events = iter_archived_activity(
+        start_date=start_date,
+        end_date=end_date,
+        user_id=user_id,
+        profile_id=profile_id,
+        activity_type=activity_type.value if activity_type else None,
+    )
+    return list(islice(events, limit))
+
+
 @app.get("/api/admin/activity/recent", response_model=List[UserActivity])
 def get_recent_activities(
     session: Session = Depends(get_session),
@@ -2064,47 +3286,64 @@ def get_activity_logs(
     user_id: Optional[int] = Query(None, description="Filter activities by user ID"),
     activity_type: Optional[ActivityType] = Query(None, description="Filter activities by activity type"),
 ):
-    statement = select(UserActivity)
-
-    if start_date:
-        statement = statement.where(UserActivity.timestamp >= start_date)
-    if end_date:
-        statement = statement.where(UserActivity.timestamp <= end_date)
-    if profile_id:
-        statement = statement.where(UserActivity.profile_id == profile_id)
+    """
+    Counts activities per time period and activity type from the hourly counters, so start_date
+    and end_date apply at hour resolution. The counters have no user dimension; filtering by
+    user_id counts the raw activity rows instead, which only cover the retention period.
+    """
     if user_id:
-        statement = statement.where(UserActivity.user_id == user_id)
-    if activity_type:
-        statement = statement.where(UserActivity.activity_type == activity_type)
+        hour = func.strftime(ROLLUP_HOUR_FORMAT, UserActivity.timestamp)
+        event_count = func.count()
+        activity_column = UserActivity.activity_type
+        conditions = [UserActivity.user_id == user_id]
+        if start_date:
+            conditions.append(UserActivity.timestamp >= start_date)
+        if end_date:
+            conditions.append(UserActivity.timestamp <= end_date)
+        if profile_id:
+            conditions.append(UserActivity.profile_id == profile_id)
+        if activity_type:
+            conditions.append(UserActivity.activity_type == activity_type)
+    else:
+        hour = ActivityHourlyCount.hour
+        event_count = func.sum(ActivityHourlyCount.event_count)
+        activity_column = ActivityHourlyCount.activity_type
+        conditions = []
+        if start_date:
+            conditions.append(ActivityHourlyCount.hour >= start_date.strftime(ROLLUP_HOUR_FORMAT))
+        if end_date:
+            conditions.append(ActivityHourlyCount.hour <= end_date.strftime(ROLLUP_HOUR_FORMAT))
+        if profile_id:
+            conditions.append(ActivityHourlyCount.profile_id == profile_id)
+        if activity_type:
+            conditions.append(ActivityHourlyCount.activity_type == activity_type)
+
+    # Periods are derived from the "YYYY-MM-DD HH:00" hour key
+    if group_by == ActivityLogGroup.HOUR:
+        period = hour
+    elif group_by == ActivityLogGroup.DAY:
+        period = func.substr(hour, 1, 10)
+    elif group_by == ActivityLogGroup.WEEK:
+        period = func.strftime("%Y-W%W", func.substr(hour, 1, 10))
+    elif group_by == ActivityLogGroup.MONTH:
+        period = func.substr(hour, 1, 7)
+    elif group_by == ActivityLogGroup.QUARTER:
+        quarter = (cast(func.substr(hour, 6, 2), Integer) + 2) // 3
+        period = func.printf("%s-Q%d", func.substr(hour, 1, 4), quarter)
+    else:
+        period = func.substr(hour, 1, 4)
 
-    activities = session.exec(statement).all()
+    rows = session.exec(
+        select(period, activity_column, event_count)
+        .where(*conditions)
+        .group_by(period, activity_column)
+    ).all()
 
-    # Grouping logic
     grouped_data = {}
-    for activity in activities:
-        timestamp = activity.timestamp
-        key = None
-
-        if group_by == ActivityLogGroup.HOUR:
-            key = timestamp.strftime("%Y-%m-%d %H:00")
-        elif group_by == ActivityLogGroup.DAY:
-            key = timestamp.strftime("%Y-%m-%d")
-        elif group_by == ActivityLogGroup.WEEK:
-            key = timestamp.strftime("%Y-W%W")
-        elif group_by == ActivityLogGroup.MONTH:
-            key = timestamp.strftime("%Y-%m")
-        elif group_by == ActivityLogGroup.QUARTER:
-            quarter = (timestamp.month - 1) // 3 + 1
-            key = f"{timestamp.year}-Q{quarter}"
-        elif group_by == ActivityLogGroup.YEAR:
-            key = timestamp.strftime("%Y")
-        
-        if key not in grouped_data:
-            grouped_data[key] = {}
-        
-        activity_type_str = activity.activity_type.value if isinstance(activity.activity_type, Enum) else activity.activity_type
-        grouped_data[key][activity_type_str] = grouped_data[key].get(activity_type_str, 0) + 1
-    
+    for time_key, row_activity_type, count in rows:
+        activity_type_str = row_activity_type.value if isinstance(row_activity_type, Enum) else row_activity_type
+        grouped_data.setdefault(time_key, {})[activity_type_str] = count
+
     # Format output for easier consumption by frontend (e.g., list of dicts)
     result = []
     for time_key, counts in sorted(grouped_data.items()):
@@ -2146,7 +3385,7 @@ def update_admin_setting(
     session.commit()
     session.refresh(setting)
     # Log activity for admin setting update (consider a new ActivityType if needed)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_PRICING_UPDATED) # Reusing for now
+    log_activity(request, admin_user.id, ActivityType.ADMIN_PRICING_UPDATED) # Reusing for now
     return setting
 
 # --- Pricing Endpoints ---
@@ -2172,7 +3411,7 @@ def create_geographic_price(
     session.add(price)
     session.commit()
     session.refresh(price)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_PRICING_CREATED)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_PRICING_CREATED)
     return price
 
 @app.get("/api/admin/pricing", response_model=List[GeographicPrice])
@@ -2202,7 +3441,7 @@ def update_geographic_price(
     session.add(price)
     session.commit()
     session.refresh(price)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_PRICING_UPDATED)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_PRICING_UPDATED)
     return price
 
 @app.get("/api/pricing", response_model=List[GeographicPrice])
@@ -2240,7 +3479,7 @@ def create_discount(
     session.add(discount)
     session.commit()
     session.refresh(discount)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_DISCOUNT_CREATED)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_DISCOUNT_CREATED)
     return discount
 
 @app.get("/api/admin/discounts", response_model=List[Discount])
@@ -2270,7 +3509,7 @@ def update_discount(
     session.add(discount)
     session.commit()
     session.refresh(discount)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_DISCOUNT_UPDATED)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_DISCOUNT_UPDATED)
     return discount
 
 @app.get("/api/discounts", response_model=List[Discount])
@@ -2314,7 +3553,7 @@ def create_proposal(
     
     session.commit()
     session.refresh(proposal)
-    log_activity(request, session, manager_user.id, ActivityType.MANAGER_PROPOSAL_CREATED)
+    log_activity(request, manager_user.id, ActivityType.MANAGER_PROPOSAL_CREATED)
     return proposal
 
 @app.get("/api/manager/proposals", response_model=List[Proposal])
@@ -2369,7 +3608,7 @@ def add_user_to_whitelist(
     session.add(whitelisted_user)
     session.commit()
     session.refresh(whitelisted_user)
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_WHITELIST_ADD, profile_id=None)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_WHITELIST_ADD, profile_id=None)
     return whitelisted_user
 
 @app.delete("/api/admin/whitelist/remove/{user_id}")
@@ -2385,7 +3624,7 @@ def remove_user_from_whitelist(
 
     session.delete(whitelisted_user)
     session.commit()
-    log_activity(request, session, admin_user.id, ActivityType.ADMIN_WHITELIST_REMOVE, profile_id=None)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_WHITELIST_REMOVE, profile_id=None)
     return {"message": "User removed from whitelist successfully"}
 
 @app.get("/api/admin/whitelist", response_model=List[WhitelistedUserResponse])
@@ -2455,7 +3694,7 @@ def approve_proposal(
     session.add(proposal)
     session.commit()
     session.refresh(proposal)
-    log_activity(session, admin_user.id, ActivityType.ADMIN_PROPOSAL_APPROVED, request)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_PROPOSAL_APPROVED)
     return proposal
 
 class RejectionReason(BaseModel):
@@ -2481,5 +3720,5 @@ def reject_proposal(
     session.add(proposal)
     session.commit()
     session.refresh(proposal)
-    log_activity(session, admin_user.id, ActivityType.ADMIN_PROPOSAL_REJECTED, request)
+    log_activity(request, admin_user.id, ActivityType.ADMIN_PROPOSAL_REJECTED)
     return proposal
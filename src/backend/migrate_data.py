@@ -1,21 +1,138 @@
 import json
+import uuid
 import pandas as pd
 from sqlmodel import Session, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from backend.database import engine
+from backend.schema import upgrade_schema
 from backend.models import User, Profile, Transaction, Category, Rule, Budget
 import os
 from pathlib import Path
 from backend.processing.rule_engine import RuleEngine # Import RuleEngine
+from backend.processing.fingerprint import transaction_fingerprint
+from backend.processing.columnar_cache import load_transactions, write_transaction_cache, cache_path_for, CSV_DATE_FORMAT
 import logging # Import logging
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 SETTINGS_FILE = PROJECT_ROOT / "data" / "user_settings" / "user_settings.json"
 CONSOLIDATED_EXPENSES_CSV = PROJECT_ROOT / "data" / "expense" / "consolidated_expenses.csv"
+INSERT_BATCH_SIZE = 1000
+
+
+def load_settings() -> dict:
+    """
+    Reads user_settings.json once. Returns an empty dict when the file does not exist.
+    """
+    if not os.path.exists(SETTINGS_FILE):
+        return {}
+    with open(SETTINGS_FILE, 'r') as f:
+        settings_json = json.load(f)
+    return {
+        "categories": [{"name": c["name"], "subcategories": c["subcategories"]} for c in settings_json.get("categories", [])],
+        "rules": settings_json.get("rules", []),
+        "budgets": settings_json.get("budgets", []),
+        "currency": settings_json.get("currency", "USD")
+    }
+
+
+def migrate_settings(session: Session, profile: Profile, settings_data: dict, rule_engine: RuleEngine):
+    """
+    Adds categories, rules and budgets from the settings file that the profile does not have yet,
+    so running the migration again does not duplicate them.
+    """
+    existing_categories = set(session.exec(select(Category.name).where(Category.profile_id == profile.id)).all())
+    for cat_data in settings_data.get("categories", []):
+        if cat_data["name"] in existing_categories:
+            continue
+        session.add(Category(
+            name=cat_data["name"],
+            subcategories=json.dumps(cat_data["subcategories"]),
+            profile_id=profile.id
+        ))
+        existing_categories.add(cat_data["name"])
+
+    # Rules are stored in the normalized multi-condition format produced by the rule engine
+    existing_rules = {
+        (r.category, r.subcategory, r.logical_operator, r.conditions)
+        for r in session.exec(select(Rule).where(Rule.profile_id == profile.id)).all()
+    }
+    for rule_data in rule_engine.rules:
+        key = (rule_data["category"], rule_data.get("subcategory"), rule_data.get("logical_operator", "AND"), json.dumps(rule_data["conditions"]))
+        if key in existing_rules:
+            continue
+        session.add(Rule(
+            category=key[0],
+            subcategory=key[1],
+            logical_operator=key[2],
+            conditions=key[3],
+            profile_id=profile.id
+        ))
+        existing_rules.add(key)
+
+    existing_budgets = {
+        (b.category, b.year, b.months)
+        for b in session.exec(select(Budget).where(Budget.profile_id == profile.id)).all()
+    }
+    for budget_data in settings_data.get("budgets", []):
+        key = (budget_data["category"], budget_data.get("year"), json.dumps(budget_data.get("months")))
+        if key in existing_budgets:
+            continue
+        session.add(Budget(
+            category=key[0],
+            amount=budget_data["amount"],
+            year=key[1],
+            months=key[2],
+            profile_id=profile.id
+        ))
+        existing_budgets.add(key)
+
+    session.commit()
+
+
+def migrate_transactions(session: Session, profile: Profile, csv_path: Path, rule_engine: RuleEngine) -> int:
+    """
+    Categorizes the CSV column-wise and inserts it in batches. Rows are fingerprinted like
+    imports, so rows already migrated are skipped. The categorized frame is also written to
+    the columnar cache, which later runs load instead of re-parsing the CSV.
+    Returns the number of rows inserted.
+    """
+    df = load_transactions(csv_path).dropna(subset=["Date", "Amount"])
+    df["Description"] = df["Description"].astype(object).fillna("")
+    df["Payment Source"] = df["Payment Source"].astype(object).fillna("")
+    categorized = rule_engine.categorize_dataframe(df)
+    write_transaction_cache(df.assign(**categorized), cache_path_for(csv_path), source_path=csv_path)
+
+    rows = pd.DataFrame({
+        "date": df["Date"].dt.strftime(CSV_DATE_FORMAT),
+        "description": df["Description"],
+        "amount": df["Amount"].astype(float),
+        "payment_source": df["Payment Source"],
+        "category": categorized["Category"],
+        "subcategory": categorized["Subcategory"],
+        "profile_id": profile.id,
+    }).to_dict(orient="records")
+    occurrences = {}
+    for row in rows:
+        row["fingerprint"] = transaction_fingerprint(row, occurrences)
+
+    statement = (
+        sqlite_insert(Transaction)
+        .on_conflict_do_nothing(index_elements=["fingerprint"])
+        .returning(Transaction.id)
+    )
+    inserted = 0
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        # render_nulls keeps rows with and without a subcategory in one multi-row INSERT
+        result = session.execute(statement, rows[start:start + INSERT_BATCH_SIZE], execution_options={"render_nulls": True})
+        inserted += len(result.all())
+        session.commit()
+    return inserted
+
 
 def migrate_data():
     logging.info("Starting data migration...")
-    from backend.database import create_db_and_tables
-    create_db_and_tables() # Create tables if they don't exist
+    # Create missing tables and apply the same column and index upgrades as the app's startup
+    upgrade_schema()
 
     with Session(engine) as session:
         # 1. Create a default user
@@ -30,86 +147,26 @@ def migrate_data():
         # 2. Create a default profile
         default_profile = session.exec(select(Profile).where(Profile.name == "Default Profile")).first()
         if not default_profile:
-            default_profile = Profile(name="Default Profile", currency="USD", user_id=default_user.id)
+            default_profile = Profile(name="Default Profile", currency="USD", user_id=default_user.id, public_id=uuid.uuid4().hex[:10])
             session.add(default_profile)
             session.commit()
             session.refresh(default_profile)
             logging.info("Default profile created.")
 
-        # Load settings for RuleEngine
-        settings_data = {}
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                settings_json = json.load(f)
-                settings_data = {
-                    "categories": [{"name": c["name"], "subcategories": c["subcategories"]} for c in settings_json.get("categories", [])],
-                    "rules": settings_json.get("rules", []),
-                    "budgets": settings_json.get("budgets", []),
-                    "currency": settings_json.get("currency", "USD")
-                }
-        
+        # Load settings once for both the RuleEngine and the settings migration
+        settings_data = load_settings()
         rule_engine = RuleEngine(settings_data=settings_data)
-        logging.info(f"Settings data loaded for RuleEngine: {settings_data}")
+        logging.info(f"Settings loaded for RuleEngine: {len(rule_engine.rules)} rules.")
 
         # 3. Migrate settings from user_settings.json
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                settings_json = json.load(f)
-
-                # Migrate categories
-                for cat_data in settings_json.get("categories", []):
-                    db_category = Category(
-                        name=cat_data["name"],
-                        subcategories=json.dumps(cat_data["subcategories"]),
-                        profile_id=default_profile.id
-                    )
-                    session.add(db_category)
-
-                # Migrate rules
-                for rule_data in settings_json.get("rules", []):
-                    db_rule = Rule(
-                        category=rule_data["category"],
-                        subcategory=rule_data.get("subcategory"),
-                        logical_operator=rule_data.get("logical_operator", "AND"),
-                        conditions=json.dumps(rule_data["conditions"]),
-                        profile_id=default_profile.id
-                    )
-                    session.add(db_rule)
-
-                # Migrate budgets
-                for budget_data in settings_json.get("budgets", []):
-                    db_budget = Budget(
-                        category=budget_data["category"],
-                        amount=budget_data["amount"],
-                        year=budget_data.get("year"),
-                        months=json.dumps(budget_data.get("months")),
-                        profile_id=default_profile.id
-                    )
-                    session.add(db_budget)
-            
-            session.commit()
+        if settings_data:
+            migrate_settings(session, default_profile, settings_data, rule_engine)
             logging.info("Settings migrated.")
 
         # 4. Migrate transactions from consolidated_expenses.csv
         if os.path.exists(CONSOLIDATED_EXPENSES_CSV):
-            df = pd.read_csv(CONSOLIDATED_EXPENSES_CSV)
-            for _, row in df.iterrows():
-                # Categorize transaction before saving
-                category, subcategory = rule_engine.categorize_transaction(row)
-                
-                db_transaction = Transaction(
-                    date=row["Date"],
-                    description=row["Description"],
-                    amount=row["Amount"],
-                    payment_source=row["Payment Source"],
-                    category=category,
-                    subcategory=subcategory,
-                    profile_id=default_profile.id
-                )
-                session.add(db_transaction)
-            
-            session.commit()
-            logging.info("Transactions migrated.")
+            inserted = migrate_transactions(session, default_profile, CONSOLIDATED_EXPENSES_CSV, rule_engine)
+            logging.info(f"Transactions migrated: {inserted} new rows.")
 
     logging.info("Data migration finished.")
 
@@ -1,10 +1,10 @@
 from typing import List, Optional, Any, Dict
 from enum import Enum
 import uuid # Import uuid
-from datetime import datetime
+from datetime import datetime, date as date_type
 
 from sqlmodel import Field, Relationship, SQLModel, JSON, Column
-from sqlalchemy import UniqueConstraint # Import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index # Import UniqueConstraint
 
 
 class Role(str, Enum):
@@ -19,6 +19,16 @@ class PaymentType(str, Enum):
     CASH = "Cash"
     OTHER = "Other"
 
+class JobType(str, Enum):
+    IMPORT_CSV = "IMPORT_CSV"
+    RECATEGORIZE = "RECATEGORIZE"
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
 class ProfileType(str, Enum):
     EXPENSE_MANAGER = "EXPENSE_MANAGER"
     ASSET_MANAGER = "ASSET_MANAGER"
@@ -47,6 +57,7 @@ class ActivityType(str, Enum):
     ASSET_RECORDED = "ASSET_RECORDED"
     ASSET_UPDATED = "ASSET_UPDATED"
     ASSET_DELETED = "ASSET_DELETED"
+    ASSET_BULK_RECORDED = "ASSET_BULK_RECORDED"
     ASSET_TYPE_CREATED = "ASSET_TYPE_CREATED"
     ASSET_TYPE_UPDATED = "ASSET_TYPE_UPDATED"
     ASSET_TYPE_DELETED = "ASSET_TYPE_DELETED"
@@ -64,6 +75,7 @@ class ActivityType(str, Enum):
     PAYMENT_SOURCE_CREATED = "PAYMENT_SOURCE_CREATED"
     PAYMENT_SOURCE_UPDATED = "PAYMENT_SOURCE_UPDATED"
     PAYMENT_SOURCE_DELETED = "PAYMENT_SOURCE_DELETED"
+    SETTINGS_UPDATED = "SETTINGS_UPDATED"
 
     PROFILE_MANAGEMENT_MODAL_OPENED = "PROFILE_MANAGEMENT_MODAL_OPENED"
     PROFILE_MANAGEMENT_MODAL_CLOSED = "PROFILE_MANAGEMENT_MODAL_CLOSED"
@@ -205,6 +217,7 @@ class Profile(SQLModel, table=True):
     is_hidden: bool = Field(default=False) # New field for hiding profiles
     profile_type: ProfileType = Field(default=ProfileType.EXPENSE_MANAGER) # New field for profile type
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    data_version: int = Field(default=0) # Bumped on every write to the profile's data; used for ETags
 
     user: Optional[User] = Relationship(back_populates="profiles")
     transactions: List["Transaction"] = Relationship(back_populates="profile", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
@@ -214,6 +227,7 @@ class Profile(SQLModel, table=True):
     payment_sources: List["PaymentSource"] = Relationship(back_populates="profile", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
     asset_types: List["AssetType"] = Relationship(back_populates="profile", sa_relationship_kwargs={"cascade": "all, delete-orphan"}) # New relationship
     assets: List["Asset"] = Relationship(back_populates="profile", sa_relationship_kwargs={"cascade": "all, delete-orphan"}) # New relationship
+    asset_monthly_values: List["AssetMonthlyValue"] = Relationship(back_populates="profile", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
 
 class UserActivity(SQLModel, table=True):
@@ -229,6 +243,24 @@ class UserActivity(SQLModel, table=True):
     user: "User" = Relationship(back_populates="activities")
 
 
+class ActivityHourlyCount(SQLModel, table=True):
+    """
+    Number of activity events per hour, activity type, profile and country, maintained by the
+    activity writer. profile_id 0 and country_code "" stand for events without one, so that
+    every key is covered by the unique index used for upserts.
+    """
+    __table_args__ = (
+        Index("ux_activityhourlycount_key", "hour", "activity_type", "profile_id", "country_code", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    hour: str = Field(max_length=16) # YYYY-MM-DD HH:00 (UTC)
+    activity_type: ActivityType
+    profile_id: int = Field(default=0)
+    country_code: str = Field(default="", max_length=2)
+    event_count: int = Field(default=0)
+
+
 class AdminSetting(SQLModel, table=True):
     key: str = Field(primary_key=True, index=True, unique=True)
     value: str
@@ -257,6 +289,8 @@ class PaymentSource(SQLModel, table=True):
 
 
 class Transaction(SQLModel, table=True):
+    __table_args__ = (Index("ux_transaction_fingerprint", "fingerprint", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     date: str
     description: str
@@ -265,6 +299,7 @@ class Transaction(SQLModel, table=True):
     category: Optional[str] = None
     subcategory: Optional[str] = None
     profile_id: Optional[int] = Field(default=None, foreign_key="profile.id")
+    fingerprint: Optional[str] = Field(default=None, max_length=64) # Content hash for imported rows; NULL for manual entries
 
     profile: Optional[Profile] = Relationship(back_populates="transactions")
 
@@ -303,11 +338,12 @@ class Budget(SQLModel, table=True):
 class AssetType(SQLModel, table=True):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     name: str = Field(index=True)
-    subtypes: str # JSON string
+    subtypes: str = Field(default="[]") # Legacy JSON copy of the subtype names; reads use the assetsubtype table
     profile_id: Optional[int] = Field(default=None, foreign_key="profile.id")
 
     profile: Optional[Profile] = Relationship(back_populates="asset_types")
     assets: List["Asset"] = Relationship(back_populates="asset_type")
+    subtype_rows: List["AssetSubtype"] = Relationship(back_populates="asset_type", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
 
     class Config:
         table_args = (
@@ -316,6 +352,17 @@ class AssetType(SQLModel, table=True):
         )
 
 
+class AssetSubtype(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("asset_type_id", "name"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    asset_type_id: str = Field(foreign_key="assettype.id", index=True)
+    name: str = Field(index=True)
+    position: int = Field(default=0) # Order of the subtype within its asset type
+
+    asset_type: Optional[AssetType] = Relationship(back_populates="subtype_rows")
+
+
 class Asset(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     date: str
@@ -325,6 +372,60 @@ class Asset(SQLModel, table=True):
     value: float
     note: Optional[str] = None # Added optional note field
     profile_id: Optional[int] = Field(default=None, foreign_key="profile.id")
+    as_of_date: Optional[date_type] = None # `date` parsed to a sortable date (first of the month for MM/YYYY)
 
     profile: Optional[Profile] = Relationship(back_populates="assets")
     asset_type: Optional[AssetType] = Relationship(back_populates="assets")
+
+
+class AssetMonthlyValue(SQLModel, table=True):
+    """
+    Monthly asset totals per (profile, month, asset type, subtype), rebuilt for the affected
+    months whenever assets are written. Backs /assets/monthly_summary range reads.
+    """
+    __table_args__ = (Index("ix_assetmonthlyvalue_profile_month", "profile_id", "year_month"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    profile_id: int = Field(foreign_key="profile.id")
+    year_month: str = Field(max_length=7) # YYYY-MM
+    asset_type_name: str
+    asset_subtype_name: Optional[str] = None
+    total_value: float
+    snapshot_count: int
+
+    profile: Optional[Profile] = Relationship(back_populates="asset_monthly_values")
+
+
+class Job(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_type: JobType
+    status: JobStatus = Field(default=JobStatus.QUEUED, index=True)
+    profile_id: int = Field(foreign_key="profile.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
+    source_path: Optional[str] = None # Uploaded file for import jobs
+    chunk_size: int = Field(default=1000)
+    checkpoint: int = Field(default=0) # Rows consumed (imports) or last transaction id (re-categorizations), committed with each chunk
+    processed_rows: int = Field(default=0)
+    total_rows: Optional[int] = None
+    attempts: int = Field(default=0)
+    error: Optional[str] = None
+    claimed_by: Optional[str] = None # "<host>:<pid>" of the process running the job
+    heartbeat_at: Optional[datetime] = None # Refreshed while running; a stale heartbeat means the process died
+    next_attempt_at: Optional[datetime] = None # Retries are not claimed before this time
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class RefreshToken(SQLModel, table=True):
+    """
+    A refresh token, stored as a SHA-256 hash. Rotation revokes the presented token and issues a
+    new one in the same family; presenting a revoked token revokes the whole family.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    token_hash: str = Field(max_length=64, unique=True)
+    family_id: str = Field(max_length=32, index=True) # Shared by every token rotated from the same login
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+    revoked_at: Optional[datetime] = None
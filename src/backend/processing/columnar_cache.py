@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pyarrow is optional; without it transactions are always parsed from CSV
+    pa = None
+    ipc = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+LOCAL_CACHE_DIR = PROJECT_ROOT / "local_cache"
+
+CSV_DATE_FORMAT = "%m/%d/%Y"
+CSV_DTYPES = {"Date": str, "Payment Source": str, "Description": str, "Amount": float}
+DICTIONARY_COLUMNS = ("Payment Source", "Category", "Subcategory")
+
+
+def cache_path_for(csv_path: Path) -> Path:
+    """
+    Location of the Arrow cache for a transaction CSV: local_cache/<csv stem>-<path hash>.arrow.
+    The hash of the resolved path keeps CSVs with the same name in different directories apart.
+    """
+    path_hash = hashlib.sha256(str(Path(csv_path).resolve()).encode()).hexdigest()[:12]
+    return LOCAL_CACHE_DIR / f"{Path(csv_path).stem}-{path_hash}.arrow"
+
+
+def _source_metadata(csv_path: Path) -> dict:
+    """
+    Identifies the exact CSV a cache was built from: resolved path, size and modification time.
+    """
+    stat = Path(csv_path).stat()
+    return {
+        b"source_path": str(Path(csv_path).resolve()).encode(),
+        b"source_size": str(stat.st_size).encode(),
+        b"source_mtime_ns": str(stat.st_mtime_ns).encode(),
+    }
+
+
+def read_transaction_csv(csv_path: Path) -> pd.DataFrame:
+    """
+    Parses a transaction CSV (Date, Payment Source, Description, Amount) into typed columns.
+    Dates become datetime64 (unparseable dates become NaT) and amounts float64.
+    """
+    df = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+    df["Date"] = pd.to_datetime(df["Date"], format=CSV_DATE_FORMAT, errors="coerce")
+    return df
+
+
+def write_transaction_cache(df: pd.DataFrame, cache_path: Path, source_path: Optional[Path] = None) -> Optional[Path]:
+    """
+    Writes transactions to an uncompressed Arrow IPC file, so it can be memory-mapped.
+    Date is stored as date32, Amount as float64, and Payment Source, Category and
+    Subcategory are dictionary encoded. The path, size and modification time of `source_path`
+    are stored in the schema metadata for the freshness check in load_transactions.
+    Returns None when pyarrow is not installed.
+    """
+    if pa is None:
+        logging.warning("pyarrow is not installed; skipping columnar cache.")
+        return None
+
+    columns = {
+        "Date": pa.array(pd.to_datetime(df["Date"], format=CSV_DATE_FORMAT, errors="coerce"), type=pa.timestamp("ns")).cast(pa.date32()),
+        "Description": pa.array(df["Description"], type=pa.string(), from_pandas=True),
+        "Amount": pa.array(df["Amount"], type=pa.float64(), from_pandas=True),
+    }
+    for column in DICTIONARY_COLUMNS:
+        if column in df.columns:
+            columns[column] = pa.array(df[column].astype(object), type=pa.string(), from_pandas=True).dictionary_encode()
+    table = pa.table(columns)
+    if source_path is not None:
+        table = table.replace_schema_metadata(_source_metadata(source_path))
+
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, cache_path)  # Readers never see a partially written file
+    logging.info(f"Wrote {table.num_rows} transactions to columnar cache {cache_path}.")
+    return cache_path
+
+
+def read_transaction_cache(cache_path: Path):
+    """
+    Memory-maps an Arrow IPC transaction cache and returns it as a pyarrow Table.
+    Column buffers reference the mapped file directly; nothing is parsed or copied.
+    """
+    source = pa.memory_map(str(cache_path), "r")
+    return ipc.open_file(source).read_all()
+
+
+def _cache_matches_source(cache_path: Path, csv_path: Path) -> bool:
+    """
+    True when the cache was built from this CSV as it is now, or the CSV no longer exists.
+    """
+    if not Path(csv_path).exists():
+        return True
+    with pa.memory_map(str(cache_path), "r") as source:
+        metadata = ipc.open_file(source).schema.metadata or {}
+    expected = _source_metadata(csv_path)
+    return all(metadata.get(key) == value for key, value in expected.items())
+
+
+def load_transactions(csv_path: Path, cache_path: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Loads transactions as a typed DataFrame, from the Arrow cache when it was built from the
+    CSV's current contents (same path, size and modification time) and from the CSV otherwise.
+    Dictionary columns come back as pandas categoricals.
+    """
+    cache_path = Path(cache_path) if cache_path else cache_path_for(csv_path)
+    if pa is not None and cache_path.exists() and _cache_matches_source(cache_path, csv_path):
+        logging.info(f"Loading transactions from columnar cache {cache_path}.")
+        return read_transaction_cache(cache_path).to_pandas(date_as_object=False)
+    return read_transaction_csv(csv_path)
+
+
+def convert_local_cache():
+    """
+    Writes an Arrow cache next to every CSV snapshot in local_cache.
+    """
+    for csv_path in sorted(LOCAL_CACHE_DIR.glob("*.csv")):
+        write_transaction_cache(read_transaction_csv(csv_path), cache_path_for(csv_path), source_path=csv_path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    convert_local_cache()
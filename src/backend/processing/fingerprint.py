@@ -0,0 +1,25 @@
+import hashlib
+from typing import Any, Dict
+
+
+def normalize_fingerprint_text(value: Any) -> str:
+    return " ".join(str(value or "").upper().split())
+
+
+def transaction_fingerprint(row: Dict[str, Any], occurrences: Dict[str, int]) -> str:
+    """
+    Content hash of an imported transaction: profile, date, amount, normalized description and
+    payment source, plus the row's occurrence ordinal among identical rows of the same import.
+    The ordinal keeps genuine repeats (two identical purchases on one day) while re-importing
+    the same statement maps every row onto its existing fingerprint.
+    """
+    content = "|".join([
+        str(row["profile_id"]),
+        str(row["date"]).strip(),
+        f"{float(row['amount']):.2f}",
+        normalize_fingerprint_text(row["description"]),
+        normalize_fingerprint_text(row["payment_source"]),
+    ])
+    ordinal = occurrences.get(content, 0)
+    occurrences[content] = ordinal + 1
+    return hashlib.sha256(f"{content}|{ordinal}".encode()).hexdigest()
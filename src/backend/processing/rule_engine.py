@@ -172,19 +172,140 @@ class RuleEngine:
         logging.info(f"Transaction '{transaction_description}' not categorized.")
         return "UNCATEGORIZED", None
 
+    def _resolve_column(self, df: pd.DataFrame, field: str):
+        """
+        Finds the DataFrame column for a rule field, accepting the same spellings as
+        _evaluate_condition ("Payment Source", "payment source", "payment_source").
+        """
+        for column in (field, field.lower(), field.lower().replace(" ", "_")):
+            if column in df.columns:
+                return df[column]
+        return None
+
+    def _evaluate_condition_vectorized(self, df: pd.DataFrame, condition: dict) -> pd.Series:
+        """
+        Column-wise equivalent of _evaluate_condition: returns a boolean mask with one entry per row.
+        """
+        field = condition.get("field")
+        rule_type = condition.get("rule_type")
+        value = condition.get("value")
+        no_match = pd.Series(False, index=df.index)
+
+        column = self._resolve_column(df, field)
+        if column is None:
+            return no_match
+        present = column.notna()
+
+        if field == "Date":
+            dates = pd.to_datetime(column, errors="coerce").dt.normalize()
+            try:
+                if rule_type == "equal":
+                    mask = dates == pd.to_datetime(value).normalize()
+                elif rule_type == "before":
+                    mask = dates < pd.to_datetime(value).normalize()
+                elif rule_type == "after":
+                    mask = dates > pd.to_datetime(value).normalize()
+                elif rule_type == "range":
+                    mask = dates.between(pd.to_datetime(value['start']).normalize(), pd.to_datetime(value['end']).normalize())
+                else:
+                    return no_match
+            except (ValueError, TypeError, KeyError):
+                return no_match
+            return mask.fillna(False) & present
+
+        if field == "Payment Source":
+            if isinstance(value, str):  # `in` on a string is a substring test
+                contained = column.astype(str).map(lambda source: source in value)
+            else:
+                contained = column.isin(value or [])
+            if rule_type == "in":
+                return contained & present
+            if rule_type == "not_in":
+                return ~contained & present
+            return no_match
+
+        # String-based fields like Description
+        if isinstance(value, (int, float)):
+            value = str(value)
+        if not isinstance(value, str):
+            return no_match
+        text = column.astype(str).str.lower()
+        needle = value.lower()
+        if rule_type == "contains":
+            mask = text.str.contains(needle, regex=False)
+        elif rule_type == "exact":
+            mask = text == needle
+        elif rule_type == "starts_with":
+            mask = text.str.startswith(needle)
+        elif rule_type == "ends_with":
+            mask = text.str.endswith(needle)
+        elif rule_type in ("equals", "greater_than", "less_than"):
+            numbers = pd.to_numeric(column, errors="coerce")
+            try:
+                number = float(value)
+            except ValueError:
+                number = None
+            if rule_type == "equals":
+                # Numeric comparison where both sides are numbers, string comparison otherwise
+                if number is None:
+                    mask = text == needle
+                else:
+                    mask = (numbers == number).where(numbers.notna(), text == needle)
+            elif number is None:
+                return no_match
+            elif rule_type == "greater_than":
+                mask = numbers > number
+            else:
+                mask = numbers < number
+        else:
+            return no_match
+        return mask.fillna(False).astype(bool) & present
+
+    def categorize_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Categorizes every row of a DataFrame of transactions column-wise.
+        Each rule is evaluated as a boolean mask over the whole frame and the first matching
+        rule wins, as in categorize_transaction. Returns a frame with 'Category' and
+        'Subcategory' columns aligned to the input index; the input is not modified.
+        """
+        categories = pd.Series("UNCATEGORIZED", index=df.index, dtype=object)
+        # A list of Nones; pd.Series(None, dtype=object) would hold NaN
+        subcategories = pd.Series([None] * len(df.index), index=df.index, dtype=object)
+        unmatched = pd.Series(True, index=df.index)
+
+        for rule in self.rules:
+            if not unmatched.any():
+                break
+            conditions = rule.get("conditions", [])
+            if not conditions:
+                continue
+            logical_operator = rule.get("logical_operator", "AND")
+            masks = [self._evaluate_condition_vectorized(df, c) for c in conditions]
+            if logical_operator == "AND":
+                matched = pd.concat(masks, axis=1).all(axis=1)
+            elif logical_operator == "OR":
+                matched = pd.concat(masks, axis=1).any(axis=1)
+            else:
+                continue
+            matched &= unmatched
+            categories[matched] = rule.get("category", "UNCATEGORIZED")
+            subcategories[matched] = rule.get("subcategory")
+            unmatched &= ~matched
+
+        logging.info(f"Categorized {len(df)} transactions, {int((~unmatched).sum())} matched a rule.")
+        return pd.DataFrame({"Category": categories, "Subcategory": subcategories}, index=df.index)
+
     def apply_rules_to_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Applies all loaded rules to a DataFrame of transactions.
         Adds 'Category' and 'Subcategory' columns to the DataFrame.
-        This method iterates over each transaction in the DataFrame and applies the categorization logic.
         """
         # Ensure 'Date' column is in datetime format for date comparisons
         if 'Date' in df.columns:
             df['Date'] = pd.to_datetime(df['Date'])
 
-        df[['Category', 'Subcategory']] = df.apply(
-            lambda row: self.categorize_transaction(row),
-            axis=1,
-            result_type='expand'
-        )
+        categorized = self.categorize_dataframe(df)
+        # Assigned one column at a time so unmatched subcategories stay None instead of becoming NaN
+        df['Category'] = categorized['Category']
+        df['Subcategory'] = categorized['Subcategory']
         return df
\ No newline at end of file
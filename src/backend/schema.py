@@ -0,0 +1,249 @@
+import logging
+import uuid
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, inspect, text
+from sqlmodel import Session, delete, select, update
+
+from backend.database import create_db_and_tables, engine
+from backend.models import Asset, AssetMonthlyValue, Profile, Transaction
+from backend.processing.fingerprint import transaction_fingerprint
+
+FINGERPRINT_COLUMNS = (
+    Transaction.id,
+    Transaction.profile_id,
+    Transaction.date,
+    Transaction.amount,
+    Transaction.description,
+    Transaction.payment_source,
+)
+
+
+def parse_asset_date(value: Optional[str]) -> Optional[date]:
+    """
+    Parses an asset date ("MM/YYYY", or "MM/DD/YYYY") into the sortable as_of_date.
+    Month-only dates map to the first of the month. Returns None if the date cannot be parsed.
+    """
+    for date_format in ("%m/%Y", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except (TypeError, ValueError):
+            continue
+    logging.error(f"Could not parse asset date '{value}'.")
+    return None
+
+
+def _backfill_asset_dates(session: Session) -> int:
+    """
+    Fills as_of_date for assets recorded before the column existed. Returns the number of rows updated.
+    """
+    updates = [
+        {"row_id": row.id, "as_of_date": parse_asset_date(row.date)}
+        for row in session.execute(select(Asset.id, Asset.date))
+    ]
+    if updates:
+        session.execute(text("UPDATE asset SET as_of_date = :as_of_date WHERE id = :row_id"), updates)
+    return len(updates)
+
+
+def _dedupe_asset_snapshots(session: Session) -> int:
+    """
+    Deletes all but the newest (highest id) asset of each snapshot key, the row POST /api/assets
+    would have updated. Affected profiles get a new data version, and the monthly asset series is
+    cleared so that startup rebuilds it. Returns the number of rows deleted.
+    """
+    snapshot_key = (Asset.profile_id, Asset.date, Asset.asset_type_id, func.coalesce(Asset.asset_subtype_name, ""))
+    duplicates = session.execute(
+        select(Asset.id, Asset.profile_id).where(Asset.id.not_in(select(func.max(Asset.id)).group_by(*snapshot_key)))
+    ).all()
+    if not duplicates:
+        return 0
+    profile_ids = {row.profile_id for row in duplicates}
+    session.execute(delete(Asset).where(Asset.id.in_([row.id for row in duplicates])))
+    session.execute(
+        update(Profile).where(Profile.id.in_(profile_ids)).values(data_version=Profile.data_version + 1)
+    )
+    session.execute(delete(AssetMonthlyValue))
+    return len(duplicates)
+
+
+def _backfill_transaction_fingerprints(session: Session) -> int:
+    """
+    Fingerprints existing transactions in id order so that re-importing data loaded before
+    fingerprints existed is recognized as duplicate. Returns the number of rows updated.
+    """
+    occurrences: Dict[str, int] = {}
+    updates = []
+    for row in session.execute(select(*FINGERPRINT_COLUMNS).order_by(Transaction.id)).mappings():
+        updates.append({"row_id": row["id"], "fingerprint": transaction_fingerprint(row, occurrences)})
+    if updates:
+        session.execute(
+            text('UPDATE "transaction" SET fingerprint = :fingerprint WHERE id = :row_id'), updates
+        )
+    return len(updates)
+
+
+def upgrade_schema():
+    """
+    Creates missing tables, then adds the columns and indexes introduced since a table was
+    first created, backfilling new columns from existing rows. Safe to run repeatedly; the app
+    runs it on startup and migrate_data before loading data.
+    """
+    create_db_and_tables()
+    with Session(engine) as session:
+        inspector = inspect(engine)
+        
+        # Check for user table columns
+        if "user" in inspector.get_table_names():
+            user_columns = inspector.get_columns("user")
+            user_column_names = [col['name'] for col in user_columns]
+            
+            if "user_first_name" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN user_first_name VARCHAR(50) DEFAULT 'Default'"))
+                session.commit()
+                logging.info("Added 'user_first_name' column to 'user' table.")
+            
+            if "user_last_name" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN user_last_name VARCHAR(50) DEFAULT 'Default'"))
+                session.commit()
+                logging.info("Added 'user_last_name' column to 'user' table.")
+
+            if "mobile_phone_number" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN mobile_phone_number VARCHAR(20)"))
+                session.commit()
+                logging.info("Added 'mobile_phone_number' column to 'user' table.")
+
+            if "country_code" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN country_code VARCHAR(2)"))
+                session.commit()
+                logging.info("Added 'country_code' column to 'user' table.")
+            
+            if "subscription_expiry_date" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN subscription_expiry_date DATETIME"))
+                session.commit()
+                logging.info("Added 'subscription_expiry_date' column to 'user' table.")
+
+            if "role" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN role VARCHAR(50) DEFAULT 'USER'"))
+                session.commit()
+                logging.info("Added 'role' column to 'user' table.")
+            
+            if "account_creation_time" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN account_creation_time DATETIME"))
+                session.commit()
+                session.execute(text(f"UPDATE user SET account_creation_time = '{datetime.utcnow().isoformat()}' WHERE account_creation_time IS NULL"))
+                session.commit()
+                logging.info("Added 'account_creation_time' column to 'user' table and populated existing rows.")
+
+            if "account_updated_time" not in user_column_names:
+                session.execute(text("ALTER TABLE user ADD COLUMN account_updated_time DATETIME"))
+                session.commit()
+                session.execute(text(f"UPDATE user SET account_updated_time = '{datetime.utcnow().isoformat()}' WHERE account_updated_time IS NULL"))
+                session.commit()
+                logging.info("Added 'account_updated_time' column to 'user' table and populated existing rows.")
+
+        columns = inspector.get_columns("profile")
+        column_names = [col['name'] for col in columns]
+        if "public_id" not in column_names:
+            session.execute(text("ALTER TABLE profile ADD COLUMN public_id VARCHAR(10)"))
+            session.commit()
+            logging.info("Added 'public_id' column to 'profile' table.")
+            
+            # Generate public_id for existing profiles
+            profiles_without_public_id = session.exec(select(Profile).where(Profile.public_id == None)).all()
+            for profile in profiles_without_public_id:
+                # Generate a simple hash for existing profiles
+                profile.public_id = str(uuid.uuid4().hex[:10]) # Generate a 10-char hex string
+                session.add(profile)
+            session.commit()
+            logging.info(f"Generated public_id for {len(profiles_without_public_id)} existing profiles.")
+        
+        if "is_hidden" not in column_names:
+            session.execute(text("ALTER TABLE profile ADD COLUMN is_hidden BOOLEAN DEFAULT FALSE"))
+            session.commit()
+            logging.info("Added 'is_hidden' column to 'profile' table with default FALSE.")
+        
+        if "profile_type" not in column_names:
+            session.execute(text("ALTER TABLE profile ADD COLUMN profile_type VARCHAR(20) DEFAULT 'EXPENSE_MANAGER'"))
+            session.commit()
+            logging.info("Added 'profile_type' column to 'profile' table with default 'EXPENSE_MANAGER'.")
+
+        if "data_version" not in column_names:
+            session.execute(text("ALTER TABLE profile ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+            session.commit()
+            logging.info("Added 'data_version' column to 'profile' table with default 0.")
+
+        # Check for useractivity table columns
+        if "useractivity" in inspector.get_table_names():
+            useractivity_columns = inspector.get_columns("useractivity")
+            useractivity_column_names = [col['name'] for col in useractivity_columns]
+
+            if "profile_id" not in useractivity_column_names:
+                session.execute(text("ALTER TABLE useractivity ADD COLUMN profile_id INTEGER"))
+                session.commit()
+                logging.info("Added 'profile_id' column to 'useractivity' table.")
+            
+            if "country_code" not in useractivity_column_names:
+                session.execute(text("ALTER TABLE useractivity ADD COLUMN country_code VARCHAR(2)"))
+                session.commit()
+                logging.info("Added 'country_code' column to 'useractivity' table.")
+        
+        # Check for job table columns
+        if "job" in inspector.get_table_names():
+            job_column_names = [col['name'] for col in inspector.get_columns("job")]
+            for column, column_type in (("claimed_by", "VARCHAR"), ("heartbeat_at", "DATETIME"), ("next_attempt_at", "DATETIME")):
+                if column not in job_column_names:
+                    session.execute(text(f"ALTER TABLE job ADD COLUMN {column} {column_type}"))
+                    session.commit()
+                    logging.info(f"Added '{column}' column to 'job' table.")
+
+        # Check for transaction table columns
+        if "transaction" in inspector.get_table_names():
+            transaction_column_names = [col['name'] for col in inspector.get_columns("transaction")]
+            if "fingerprint" not in transaction_column_names:
+                session.execute(text('ALTER TABLE "transaction" ADD COLUMN fingerprint VARCHAR(64)'))
+                backfilled = _backfill_transaction_fingerprints(session)
+                session.commit()
+                logging.info(f"Added 'fingerprint' column to 'transaction' table and backfilled {backfilled} rows.")
+        session.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS ux_transaction_fingerprint ON "transaction" (fingerprint)'
+        ))
+
+        # Check for asset table columns
+        if "asset" in inspector.get_table_names():
+            asset_column_names = [col['name'] for col in inspector.get_columns("asset")]
+            if "as_of_date" not in asset_column_names:
+                session.execute(text("ALTER TABLE asset ADD COLUMN as_of_date DATE"))
+                backfilled = _backfill_asset_dates(session)
+                session.commit()
+                logging.info(f"Added 'as_of_date' column to 'asset' table and backfilled {backfilled} rows.")
+        session.execute(text("CREATE INDEX IF NOT EXISTS ix_asset_profile_as_of_date ON asset (profile_id, as_of_date)"))
+        # One asset snapshot per (profile, date, asset type, subtype); backs the bulk upsert in POST /api/assets
+        # Checked in sqlite_master; SQLAlchemy does not reflect expression indexes
+        snapshot_index = session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_asset_snapshot'"
+        )).first()
+        if snapshot_index is None:
+            removed = _dedupe_asset_snapshots(session)
+            if removed:
+                logging.warning(f"Removed {removed} duplicate asset snapshots before creating 'ux_asset_snapshot'.")
+        session.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_asset_snapshot ON asset "
+            "(profile_id, date, asset_type_id, COALESCE(asset_subtype_name, ''))"
+        ))
+
+        # Indexes backing keyset pagination and filtering of /api/expenses
+        session.execute(text('CREATE INDEX IF NOT EXISTS ix_transaction_profile_id ON "transaction" (profile_id)'))
+        session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_transaction_profile_sort_date ON "transaction" '
+            '(profile_id, (substr(date, 7, 4) || substr(date, 1, 2) || substr(date, 4, 2)), id)'
+        ))
+        session.commit()
+
+        # Ensure whitelisteduser table is created
+        if "whitelisteduser" not in inspector.get_table_names():
+            # SQLModel will create the table if it doesn't exist during create_db_and_tables()
+            # But if it was added later, we might need a migration.
+            # For now, assume create_db_and_tables() handles it on first run.
+            logging.info("WhitelistedUser table check. Assuming create_db_and_tables() handles creation.")
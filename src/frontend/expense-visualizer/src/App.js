@@ -253,7 +253,7 @@ function MainApp({ currentUser, onSubscribe }) {
               setMonthlyAggregatedExpenses([]);
             }
           } else if (activeProfileType === "ASSET_MANAGER") {
-            axios.get(`${API_BASE_URL}/api/profiles/${activeProfileId}/assets/summary?year=${selectedYearDashboard}`)
+            axios.get(`${API_BASE_URL}/api/profiles/${activeProfileId}/assets/summary?year=${selectedYearDashboard}&include_assets=false`)
               .then(response => {
                 console.log("Asset summary for dashboard:", response.data);
               })